@@ -2,13 +2,38 @@
 Agent Collaboration - Inter-agent messaging and shared knowledge base
 """
 
+import re
+import sys
+import logging
 import time
 import threading
 import json
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Callable, Any
-from collections import deque
+from typing import Dict, List, Optional, Callable, Any, Set, Tuple
+from collections import deque, defaultdict, OrderedDict
+from itertools import count, islice
+from queue import SimpleQueue
+from .text_index import SubstringIndex
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+_SEARCH_CACHE_SIZE = 128
+_RAW_DATA_LIMIT = 500
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str).encode()
 
 
 class MessageType(Enum):
@@ -28,7 +53,7 @@ class MessagePriority(Enum):
     URGENT = 4
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentMessage:
     id: str
     sender_id: int
@@ -40,23 +65,38 @@ class AgentMessage:
     timestamp: float = field(default_factory=time.time)
     read: bool = False
     acknowledged: bool = False
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
+    _type_value: str = field(default="", init=False, repr=False, compare=False)
+    _priority_value: int = field(default=0, init=False, repr=False, compare=False)
+    _holders: int = field(default=0, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Resolve Enum .value once instead of on every serialize/route
+        self._type_value = self.message_type.value
+        self._priority_value = self.priority.value
     
     def to_dict(self) -> dict:
-        return {
+        # Cached until a mutation sets _dirty; callers must treat it as read-only
+        if not self._dirty and self._cached_dict is not None:
+            return self._cached_dict
+        self._cached_dict = {
             "id": self.id,
             "sender_id": self.sender_id,
             "receiver_id": self.receiver_id,
-            "message_type": self.message_type.value,
-            "priority": self.priority.value,
+            "message_type": self._type_value,
+            "priority": self._priority_value,
             "content": self.content,
             "data": self.data,
             "timestamp": self.timestamp,
             "read": self.read,
             "acknowledged": self.acknowledged
         }
+        self._dirty = False
+        return self._cached_dict
 
 
-@dataclass
+@dataclass(slots=True)
 class SharedKnowledgeEntry:
     key: str
     value: Any
@@ -64,9 +104,15 @@ class SharedKnowledgeEntry:
     timestamp: float = field(default_factory=time.time)
     access_count: int = 0
     tags: List[str] = field(default_factory=list)
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _cached_json: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
     
     def to_dict(self) -> dict:
-        return {
+        if not self._dirty and self._cached_dict is not None:
+            return self._cached_dict
+        self._cached_json = None
+        self._cached_dict = {
             "key": self.key,
             "value": self.value,
             "contributor_id": self.contributor_id,
@@ -74,18 +120,192 @@ class SharedKnowledgeEntry:
             "access_count": self.access_count,
             "tags": self.tags
         }
+        self._dirty = False
+        return self._cached_dict
+    
+    def to_json_bytes(self) -> bytes:
+        if self._dirty or self._cached_json is None:
+            self._cached_json = _json_dumps(self.to_dict())
+        return self._cached_json
+
+
+class _InboxStats:
+    """Running message totals across all inboxes, kept so get_summary does
+    not have to walk every message. A broadcast is one object shared by every
+    inbox that pulled it, so each message tracks how many inboxes hold it."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = 0
+        self.unread = 0
+    
+    def record(self, added: List["AgentMessage"], removed: List["AgentMessage"]):
+        with self.lock:
+            for message in added:
+                message._holders += 1
+                if not message.read:
+                    self.unread += 1
+            for message in removed:
+                message._holders -= 1
+                if not message.read:
+                    self.unread -= 1
+            self.total += len(added) - len(removed)
+    
+    def mark_read(self, message: "AgentMessage") -> bool:
+        with self.lock:
+            if message.read:
+                return False
+            message.read = True
+            self.unread -= message._holders
+            return True
+    
+    def reset(self):
+        with self.lock:
+            self.total = 0
+            self.unread = 0
+
+
+class _Inbox:
+    """Per-agent inbox. Senders enqueue onto a SimpleQueue without taking a
+    Python-level lock; the bounded history is only touched on the read side.
+    
+    Drained messages are kept in one FIFO bucket per priority level so reads
+    come out already ordered by (priority desc, arrival) without sorting.
+    Broadcasts are not pushed here; they are pulled from the shared broadcast
+    log via read_broadcasts(cursor) when the inbox is drained.
+    """
+    
+    def __init__(
+        self,
+        maxlen: int = 100,
+        read_broadcasts: Optional[Callable[[int], Tuple[List["AgentMessage"], int]]] = None,
+        broadcast_cursor: int = 0,
+        stats: Optional[_InboxStats] = None
+    ):
+        self.maxlen = maxlen
+        self.stats = stats
+        self.read_broadcasts = read_broadcasts
+        self.broadcast_cursor = broadcast_cursor
+        self.pending: SimpleQueue = SimpleQueue()
+        self.buckets: List[deque] = [deque() for _ in MessagePriority]
+        self.arrivals: deque = deque()
+        self.by_id: Dict[str, AgentMessage] = {}
+        self.lock = threading.Lock()
+    
+    def put(self, message: AgentMessage):
+        self.pending.put_nowait(message)
+        # Keep an unread inbox bounded without making senders wait on readers
+        if self.pending.qsize() > self.maxlen and self.lock.acquire(blocking=False):
+            try:
+                self.drain()
+            finally:
+                self.lock.release()
+    
+    def drain(self):
+        # Caller must hold self.lock
+        # Bulk dequeue: only this side consumes, so qsize() is a lower bound
+        # and we never pay for raising Empty on a routine drain
+        pending = self.pending
+        get = pending.get_nowait
+        incoming = [get() for _ in range(pending.qsize())]
+        
+        if self.read_broadcasts is not None:
+            broadcasts, self.broadcast_cursor = self.read_broadcasts(self.broadcast_cursor)
+            if broadcasts:
+                if incoming:
+                    incoming.extend(broadcasts)
+                    incoming.sort(key=lambda m: m.timestamp)
+                else:
+                    incoming = broadcasts
+        
+        if not incoming:
+            return
+        
+        buckets = self.buckets
+        arrivals = self.arrivals
+        by_id = self.by_id
+        evicted_messages = []
+        for message in incoming:
+            if len(arrivals) >= self.maxlen:
+                # The oldest arrival is always at the head of its own bucket
+                evicted = arrivals.popleft()
+                buckets[evicted._priority_value - 1].popleft()
+                by_id.pop(evicted.id, None)
+                evicted_messages.append(evicted)
+            arrivals.append(message)
+            buckets[message._priority_value - 1].append(message)
+            by_id[message.id] = message
+        
+        if self.stats is not None:
+            self.stats.record(incoming, evicted_messages)
+    
+    def snapshot(self, unread_only: bool = False, top_k: Optional[int] = None) -> List[AgentMessage]:
+        with self.lock:
+            self.drain()
+            messages = []
+            for bucket in reversed(self.buckets):
+                if unread_only:
+                    messages.extend(m for m in bucket if not m.read)
+                else:
+                    messages.extend(bucket)
+                if top_k is not None and len(messages) >= top_k:
+                    return messages[:top_k]
+            return messages
+    
+    def find(self, message_id: str) -> Optional[AgentMessage]:
+        # Caller must hold self.lock
+        self.drain()
+        return self.by_id.get(message_id)
+    
+    def __len__(self) -> int:
+        with self.lock:
+            self.drain()
+            return len(self.arrivals)
+    
+    def sync(self):
+        with self.lock:
+            self.drain()
+    
+    def discard(self):
+        with self.lock:
+            self.drain()
+            if self.stats is not None:
+                self.stats.record([], list(self.arrivals))
+            self.arrivals.clear()
+            self.by_id.clear()
+            for bucket in self.buckets:
+                bucket.clear()
 
 
 class AgentCollaboration:
     def __init__(self):
-        self.message_queues: Dict[int, deque] = {}
+        self.message_queues: Dict[int, _Inbox] = {}
         self.broadcast_queue: deque = deque(maxlen=100)
         self.shared_knowledge: Dict[str, SharedKnowledgeEntry] = {}
-        self.agent_subscriptions: Dict[int, List[str]] = {}
+        
+        # Read-side snapshot, republished by writers after each mutation.
+        # Attribute assignment is atomic, so readers never need a lock.
+        self._inbox_snapshot: Tuple[_Inbox, ...] = ()
+        self.agent_subscriptions: Dict[int, Set[str]] = {}
         self.agent_capabilities: Dict[int, List[str]] = {}
         
-        self._lock = threading.Lock()
-        self._next_message_id = 1
+        self._capability_index: Dict[str, Set[int]] = defaultdict(set)
+        self._topic_subscribers: Dict[str, Set[int]] = defaultdict(set)
+        self._token_index: Dict[str, Set[str]] = defaultdict(set)
+        # _token_index's tokens by substring, so a query word finds the
+        # tokens containing it without scanning the vocabulary
+        self._vocabulary = SubstringIndex()
+        self._tag_index: Dict[str, Set[str]] = defaultdict(set)
+        self._search_text: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._key_order: Dict[str, int] = {}
+        self._search_cache: "OrderedDict[tuple, Tuple[str, ...]]" = OrderedDict()
+        
+        self._knowledge_lock = threading.RLock()
+        self._registry_lock = threading.Lock()
+        self._broadcast_lock = threading.Lock()
+        self._broadcast_total = 0
+        self._stats = _InboxStats()
+        self._id_counter = count(1)
         
         self._callbacks: Dict[str, List[Callable]] = {
             "message_sent": [],
@@ -94,25 +314,56 @@ class AgentCollaboration:
             "help_requested": [],
             "broadcast": []
         }
+        self._recent_errors: deque = deque(maxlen=256)
     
     def register_agent(self, agent_id: int, capabilities: Optional[List[str]] = None):
-        with self._lock:
+        with self._registry_lock:
             if agent_id not in self.message_queues:
-                self.message_queues[agent_id] = deque(maxlen=100)
+                self.message_queues[agent_id] = _Inbox(
+                    maxlen=100,
+                    read_broadcasts=self._read_broadcasts,
+                    broadcast_cursor=self._broadcast_total,
+                    stats=self._stats
+                )
+                self._inbox_snapshot = tuple(self.message_queues.values())
             
             if capabilities:
+                self._unindex_capabilities(agent_id)
                 self.agent_capabilities[agent_id] = capabilities
+                for capability in capabilities:
+                    self._capability_index[capability].add(agent_id)
             
-            self.agent_subscriptions[agent_id] = []
+            self._unindex_subscriptions(agent_id)
+            self.agent_subscriptions[agent_id] = set()
     
     def unregister_agent(self, agent_id: int):
-        with self._lock:
-            if agent_id in self.message_queues:
-                del self.message_queues[agent_id]
-            if agent_id in self.agent_capabilities:
-                del self.agent_capabilities[agent_id]
-            if agent_id in self.agent_subscriptions:
-                del self.agent_subscriptions[agent_id]
+        with self._registry_lock:
+            inbox = self.message_queues.pop(agent_id, None)
+            if inbox is not None:
+                self._inbox_snapshot = tuple(self.message_queues.values())
+                inbox.discard()
+            self._unindex_capabilities(agent_id)
+            self._unindex_subscriptions(agent_id)
+            self.agent_capabilities.pop(agent_id, None)
+            self.agent_subscriptions.pop(agent_id, None)
+    
+    def _unindex_capabilities(self, agent_id: int):
+        # Caller must hold self._registry_lock
+        for capability in self.agent_capabilities.get(agent_id, ()):
+            agents = self._capability_index.get(capability)
+            if agents is not None:
+                agents.discard(agent_id)
+                if not agents:
+                    del self._capability_index[capability]
+    
+    def _unindex_subscriptions(self, agent_id: int):
+        # Caller must hold self._registry_lock
+        for topic in self.agent_subscriptions.get(agent_id, ()):
+            subscribers = self._topic_subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(agent_id)
+                if not subscribers:
+                    del self._topic_subscribers[topic]
     
     def send_message(
         self,
@@ -123,31 +374,41 @@ class AgentCollaboration:
         data: Optional[Dict] = None,
         priority: MessagePriority = MessagePriority.NORMAL
     ) -> AgentMessage:
-        with self._lock:
-            message_id = f"msg_{self._next_message_id}"
-            self._next_message_id += 1
-            
-            message = AgentMessage(
-                id=message_id,
-                sender_id=sender_id,
-                receiver_id=receiver_id,
-                message_type=message_type,
-                priority=priority,
-                content=content,
-                data=data or {}
-            )
-            
-            if receiver_id is None:
+        # count.__next__ and dict.get are atomic under the GIL, so no lock here
+        message_id = f"msg_{next(self._id_counter)}"
+        inbox = self.message_queues.get(receiver_id) if receiver_id is not None else None
+        
+        message = AgentMessage(
+            id=message_id,
+            sender_id=sender_id,
+            receiver_id=receiver_id,
+            message_type=message_type,
+            priority=priority,
+            content=content,
+            data=data or {}
+        )
+        
+        if receiver_id is None:
+            with self._broadcast_lock:
                 self.broadcast_queue.append(message)
-                for queue in self.message_queues.values():
-                    queue.append(message)
-                self._notify("broadcast", message)
-            else:
-                if receiver_id in self.message_queues:
-                    self.message_queues[receiver_id].append(message)
-            
-            self._notify("message_sent", message)
-            return message
+                self._broadcast_total += 1
+            self._notify("broadcast", message)
+        elif inbox is not None:
+            inbox.put(message)
+        
+        self._notify("message_sent", message)
+        return message
+    
+    def _read_broadcasts(self, cursor: int) -> Tuple[List[AgentMessage], int]:
+        # Only the last maxlen broadcasts are retained, which is all an inbox
+        # could hold anyway, so a lagging cursor just skips evicted entries.
+        if cursor == self._broadcast_total:
+            return [], cursor
+        with self._broadcast_lock:
+            total = self._broadcast_total
+            log = self.broadcast_queue
+            count = min(total - cursor, len(log))
+            return list(islice(log, len(log) - count, None)), total
     
     def share_finding(
         self,
@@ -157,6 +418,14 @@ class AgentCollaboration:
         tool: str,
         raw_data: Optional[str] = None
     ) -> AgentMessage:
+        if not raw_data:
+            raw_data = None
+        elif len(raw_data) > _RAW_DATA_LIMIT:
+            if isinstance(raw_data, (bytes, bytearray)):
+                raw_data = bytes(memoryview(raw_data)[:_RAW_DATA_LIMIT])
+            else:
+                raw_data = raw_data[:_RAW_DATA_LIMIT]
+        
         return self.send_message(
             sender_id=sender_id,
             receiver_id=None,
@@ -165,7 +434,7 @@ class AgentCollaboration:
             data={
                 "severity": severity,
                 "tool": tool,
-                "raw_data": raw_data[:500] if raw_data else None
+                "raw_data": raw_data
             },
             priority=MessagePriority.HIGH if severity in ["critical", "high"] else MessagePriority.NORMAL
         )
@@ -223,30 +492,34 @@ class AgentCollaboration:
             priority=MessagePriority.HIGH
         )
     
-    def get_messages(self, agent_id: int, unread_only: bool = False) -> List[AgentMessage]:
-        if agent_id not in self.message_queues:
+    def get_messages(
+        self,
+        agent_id: int,
+        unread_only: bool = False,
+        top_k: Optional[int] = None
+    ) -> List[AgentMessage]:
+        inbox = self.message_queues.get(agent_id)
+        if inbox is None:
             return []
         
-        messages = list(self.message_queues[agent_id])
-        
-        if unread_only:
-            messages = [m for m in messages if not m.read]
-        
-        return sorted(messages, key=lambda m: (-m.priority.value, m.timestamp))
+        return inbox.snapshot(unread_only, top_k)
     
     def mark_read(self, agent_id: int, message_id: str):
-        if agent_id in self.message_queues:
-            for message in self.message_queues[agent_id]:
-                if message.id == message_id:
-                    message.read = True
-                    break
+        inbox = self.message_queues.get(agent_id)
+        if inbox is not None:
+            with inbox.lock:
+                message = inbox.find(message_id)
+                if message is not None and self._stats.mark_read(message):
+                    message._dirty = True
     
     def acknowledge_message(self, agent_id: int, message_id: str):
-        if agent_id in self.message_queues:
-            for message in self.message_queues[agent_id]:
-                if message.id == message_id:
+        inbox = self.message_queues.get(agent_id)
+        if inbox is not None:
+            with inbox.lock:
+                message = inbox.find(message_id)
+                if message is not None:
                     message.acknowledged = True
-                    break
+                    message._dirty = True
     
     def share_knowledge(
         self,
@@ -255,84 +528,174 @@ class AgentCollaboration:
         value: Any,
         tags: Optional[List[str]] = None
     ):
-        with self._lock:
+        with self._knowledge_lock:
             entry = SharedKnowledgeEntry(
                 key=key,
                 value=value,
                 contributor_id=agent_id,
-                tags=tags or []
+                tags=[sys.intern(tag) for tag in tags] if tags else []
             )
             
+            old_entry = self.shared_knowledge.get(key)
+            if old_entry is not None:
+                self._unindex_knowledge(old_entry)
             self.shared_knowledge[key] = entry
-            self._notify("knowledge_shared", entry)
+            self._index_knowledge(entry)
+        # Notify outside the lock so callbacks can read or share knowledge
+        self._notify("knowledge_shared", entry)
+    
+    def _index_knowledge(self, entry: SharedKnowledgeEntry):
+        # Caller must hold self._knowledge_lock
+        key = entry.key
+        key_lower = key.lower()
+        value_lower = entry.value.lower() if isinstance(entry.value, str) else None
+        
+        self._search_text[key] = (key_lower, value_lower)
+        self._key_order.setdefault(key, len(self._key_order))
+        token_index = self._token_index
+        for token in set(_TOKEN_RE.findall(key_lower + " " + (value_lower or ""))):
+            if token not in token_index:
+                self._vocabulary.add(token)
+            token_index[token].add(key)
+        for tag in entry.tags:
+            self._tag_index[tag].add(key)
+        self._search_cache.clear()
+    
+    def _unindex_knowledge(self, entry: SharedKnowledgeEntry):
+        # Caller must hold self._knowledge_lock
+        key = entry.key
+        key_lower, value_lower = self._search_text.pop(key, (key.lower(), None))
+        for token in set(_TOKEN_RE.findall(key_lower + " " + (value_lower or ""))):
+            postings = self._token_index.get(token)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._token_index[token]
+                    self._vocabulary.discard(token)
+        for tag in entry.tags:
+            postings = self._tag_index.get(tag)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._tag_index[tag]
+        self._search_cache.clear()
     
     def get_knowledge(self, key: str) -> Optional[Any]:
-        entry = self.shared_knowledge.get(key)
+        with self._knowledge_lock:
+            entry = self.shared_knowledge.get(key)
         if entry:
             entry.access_count += 1
+            entry._dirty = True
             return entry.value
         return None
     
     def search_knowledge(self, query: str, tags: Optional[List[str]] = None) -> List[SharedKnowledgeEntry]:
-        results = []
         query_lower = query.lower()
+        cache_key = (query_lower, tuple(tags) if tags else None)
         
-        for key, entry in self.shared_knowledge.items():
-            if query_lower in key.lower():
-                results.append(entry)
-                continue
-            
-            if isinstance(entry.value, str) and query_lower in entry.value.lower():
-                results.append(entry)
-                continue
+        with self._knowledge_lock:
+            keys = self._search_cache.get(cache_key)
+            if keys is not None:
+                self._search_cache.move_to_end(cache_key)
+            else:
+                keys = self._search_keys(query_lower, tags)
+                self._search_cache[cache_key] = keys
+                if len(self._search_cache) > _SEARCH_CACHE_SIZE:
+                    self._search_cache.popitem(last=False)
             
-            if tags:
-                if any(tag in entry.tags for tag in tags):
-                    results.append(entry)
+            return [self.shared_knowledge[k] for k in keys]
+    
+    def _search_keys(self, query_lower: str, tags: Optional[List[str]]) -> Tuple[str, ...]:
+        # Caller must hold self._knowledge_lock
+        query_tokens = set(_TOKEN_RE.findall(query_lower))
+        
+        if query_tokens:
+            # Every word in the query must be a substring of some indexed token,
+            # so the postings give a candidate superset to verify exactly.
+            candidates: Optional[Set[str]] = None
+            token_index = self._token_index
+            for query_token in query_tokens:
+                postings: Set[str] = set()
+                for token in self._vocabulary.tokens_containing(query_token):
+                    postings |= token_index[token]
+                candidates = postings if candidates is None else candidates & postings
+                if not candidates:
+                    break
+        else:
+            candidates = set(self._search_text)
+        
+        matched = {
+            key for key in candidates
+            if query_lower in self._search_text[key][0]
+            or (self._search_text[key][1] is not None and query_lower in self._search_text[key][1])
+        }
         
-        return results
+        if tags:
+            for tag in tags:
+                matched |= self._tag_index.get(tag, set())
+        
+        return tuple(sorted(matched, key=self._key_order.__getitem__))
     
     def get_all_knowledge(self) -> Dict[str, Any]:
-        return {k: v.to_dict() for k, v in self.shared_knowledge.items()}
+        with self._knowledge_lock:
+            return {k: v.to_dict() for k, v in self.shared_knowledge.items()}
+    
+    def get_all_knowledge_json(self) -> bytes:
+        """JSON encoding of get_all_knowledge(), assembled from each entry's
+        cached serialized bytes so unchanged entries are not re-encoded."""
+        with self._knowledge_lock:
+            return b"{" + b",".join(
+                _json_dumps(key) + b":" + entry.to_json_bytes()
+                for key, entry in self.shared_knowledge.items()
+            ) + b"}"
     
     def find_capable_agent(self, capability: str) -> Optional[int]:
-        for agent_id, capabilities in self.agent_capabilities.items():
-            if capability in capabilities:
-                return agent_id
-        return None
+        return next(iter(self._capability_index.get(capability, ())), None)
     
     def subscribe(self, agent_id: int, topic: str):
-        if agent_id in self.agent_subscriptions:
-            if topic not in self.agent_subscriptions[agent_id]:
-                self.agent_subscriptions[agent_id].append(topic)
+        topic = sys.intern(topic)
+        with self._registry_lock:
+            subscriptions = self.agent_subscriptions.get(agent_id)
+            if subscriptions is not None:
+                subscriptions.add(topic)
+                self._topic_subscribers[topic].add(agent_id)
     
     def unsubscribe(self, agent_id: int, topic: str):
-        if agent_id in self.agent_subscriptions:
-            if topic in self.agent_subscriptions[agent_id]:
-                self.agent_subscriptions[agent_id].remove(topic)
+        topic = sys.intern(topic)
+        with self._registry_lock:
+            subscriptions = self.agent_subscriptions.get(agent_id)
+            if subscriptions is not None and topic in subscriptions:
+                subscriptions.discard(topic)
+                subscribers = self._topic_subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(agent_id)
+                    if not subscribers:
+                        del self._topic_subscribers[topic]
     
     def broadcast_to_subscribers(self, topic: str, content: str, data: Optional[Dict] = None):
-        for agent_id, subscriptions in self.agent_subscriptions.items():
-            if topic in subscriptions:
-                self.send_message(
-                    sender_id=0,
-                    receiver_id=agent_id,
-                    message_type=MessageType.BROADCAST,
-                    content=content,
-                    data={"topic": topic, **(data or {})}
-                )
+        topic = sys.intern(topic)
+        with self._registry_lock:
+            subscribers = list(self._topic_subscribers.get(topic, ()))
+        
+        for agent_id in subscribers:
+            self.send_message(
+                sender_id=0,
+                receiver_id=agent_id,
+                message_type=MessageType.BROADCAST,
+                content=content,
+                data={"topic": topic, **(data or {})}
+            )
     
     def get_summary(self) -> dict:
-        total_messages = sum(len(q) for q in self.message_queues.values())
-        unread_count = sum(
-            sum(1 for m in q if not m.read)
-            for q in self.message_queues.values()
-        )
+        # Pull in anything still pending so the running totals are current
+        inboxes = self._inbox_snapshot
+        for inbox in inboxes:
+            inbox.sync()
         
         return {
-            "registered_agents": len(self.message_queues),
-            "total_messages": total_messages,
-            "unread_messages": unread_count,
+            "registered_agents": len(inboxes),
+            "total_messages": self._stats.total,
+            "unread_messages": self._stats.unread,
             "broadcast_count": len(self.broadcast_queue),
             "knowledge_entries": len(self.shared_knowledge),
             "agents_with_capabilities": len(self.agent_capabilities)
@@ -347,11 +710,23 @@ class AgentCollaboration:
             try:
                 callback(data)
             except Exception as e:
-                print(f"Collaboration callback error: {e}")
+                self._recent_errors.append((time.time(), event, repr(e)))
+                logger.warning("Collaboration callback error: %s", e)
     
     def clear(self):
-        with self._lock:
+        with self._registry_lock:
             self.message_queues.clear()
-            self.broadcast_queue.clear()
-            self.shared_knowledge.clear()
+            self._inbox_snapshot = ()
+            self._stats.reset()
+            with self._broadcast_lock:
+                self.broadcast_queue.clear()
             self.agent_subscriptions.clear()
+            self._topic_subscribers.clear()
+        with self._knowledge_lock:
+            self.shared_knowledge.clear()
+            self._token_index.clear()
+            self._vocabulary.clear()
+            self._tag_index.clear()
+            self._search_text.clear()
+            self._key_order.clear()
+            self._search_cache.clear()
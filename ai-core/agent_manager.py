@@ -4,14 +4,19 @@ Agent Manager - Handles AI agent lifecycle and coordination
 
 import json
 import os
+import logging
 import time
 import threading
+from itertools import count
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Callable
 from datetime import datetime
+from collections import deque
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+@dataclass(slots=True)
 class Agent:
     id: int
     name: str
@@ -24,8 +29,18 @@ class Agent:
     network_usage: float = 0.0
     tasks_done: int = 0
     tasks_failed: int = 0
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
     
     def to_dict(self) -> dict:
+        # Static fields are cached until a mutation sets _dirty; uptime is
+        # time-dependent so it is always added fresh
+        if self._dirty or self._cached_dict is None:
+            self._cached_dict = self._build_dict()
+            self._dirty = False
+        return {**self._cached_dict, "uptime": time.time() - self.start_time}
+    
+    def _build_dict(self) -> dict:
         return {
             "id": self.id,
             "name": self.name,
@@ -37,8 +52,7 @@ class Agent:
             "cpu_usage": self.cpu_usage,
             "network_usage": self.network_usage,
             "tasks_done": self.tasks_done,
-            "tasks_failed": self.tasks_failed,
-            "uptime": time.time() - self.start_time
+            "tasks_failed": self.tasks_failed
         }
 
 
@@ -47,33 +61,41 @@ class AgentManager:
         self.agents: Dict[int, Agent] = {}
         self.max_agents = max_agents
         self._lock = threading.Lock()
-        self._next_id = 1
+        self._id_counter = count(1)
+        self._status_counts: Dict[str, int] = {}
+        self._total_done = 0
+        self._total_failed = 0
         self._callbacks: Dict[str, List[Callable]] = {
             "agent_added": [],
             "agent_removed": [],
             "agent_updated": [],
             "status_changed": []
         }
+        self._recent_errors: deque = deque(maxlen=256)
     
     def add_agent(self, name: str) -> Optional[Agent]:
         with self._lock:
             if len(self.agents) >= self.max_agents:
                 return None
             
+            agent_id = next(self._id_counter)
             agent = Agent(
-                id=self._next_id,
+                id=agent_id,
                 name=name
             )
-            self.agents[self._next_id] = agent
-            self._next_id += 1
+            self.agents[agent_id] = agent
+            self._status_counts[agent.status] = self._status_counts.get(agent.status, 0) + 1
             
             self._notify("agent_added", agent)
             return agent
     
     def remove_agent(self, agent_id: int) -> bool:
         with self._lock:
-            if agent_id in self.agents:
-                agent = self.agents.pop(agent_id)
+            agent = self.agents.pop(agent_id, None)
+            if agent is not None:
+                self._status_counts[agent.status] -= 1
+                self._total_done -= agent.tasks_done
+                self._total_failed -= agent.tasks_failed
                 self._notify("agent_removed", agent)
                 return True
             return False
@@ -92,12 +114,16 @@ class AgentManager:
     
     def update_agent_status(self, agent_id: int, status: str, task: str = ""):
         with self._lock:
-            if agent_id in self.agents:
-                agent = self.agents[agent_id]
+            agent = self.agents.get(agent_id)
+            if agent is not None:
                 old_status = agent.status
                 agent.status = status
                 agent.current_task = task
+                if old_status != status:
+                    self._status_counts[old_status] -= 1
+                    self._status_counts[status] = self._status_counts.get(status, 0) + 1
                 agent.last_execute = time.time()
+                agent._dirty = True
                 
                 if old_status != status:
                     self._notify("status_changed", agent)
@@ -105,21 +131,25 @@ class AgentManager:
     
     def update_agent_metrics(self, agent_id: int, memory: float, cpu: float, network: float):
         with self._lock:
-            if agent_id in self.agents:
-                agent = self.agents[agent_id]
+            agent = self.agents.get(agent_id)
+            if agent is not None:
                 agent.memory_usage = memory
                 agent.cpu_usage = cpu
                 agent.network_usage = network
+                agent._dirty = True
                 self._notify("agent_updated", agent)
     
     def increment_task_count(self, agent_id: int, success: bool):
         with self._lock:
-            if agent_id in self.agents:
-                agent = self.agents[agent_id]
+            agent = self.agents.get(agent_id)
+            if agent is not None:
                 if success:
                     agent.tasks_done += 1
+                    self._total_done += 1
                 else:
                     agent.tasks_failed += 1
+                    self._total_failed += 1
+                agent._dirty = True
     
     def on(self, event: str, callback: Callable):
         if event in self._callbacks:
@@ -130,18 +160,15 @@ class AgentManager:
             try:
                 callback(agent)
             except Exception as e:
-                print(f"Error in callback: {e}")
+                self._recent_errors.append((time.time(), event, repr(e)))
+                logger.warning("Error in callback: %s", e)
     
     def get_summary(self) -> dict:
-        total = len(self.agents)
-        idle = sum(1 for a in self.agents.values() if a.status == "idle")
-        running = sum(1 for a in self.agents.values() if a.status == "running")
-        
         return {
-            "total_agents": total,
-            "idle_agents": idle,
-            "running_agents": running,
+            "total_agents": len(self.agents),
+            "idle_agents": self._status_counts.get("idle", 0),
+            "running_agents": self._status_counts.get("running", 0),
             "max_agents": self.max_agents,
-            "total_tasks_done": sum(a.tasks_done for a in self.agents.values()),
-            "total_tasks_failed": sum(a.tasks_failed for a in self.agents.values())
+            "total_tasks_done": self._total_done,
+            "total_tasks_failed": self._total_failed
         }
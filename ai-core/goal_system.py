@@ -2,13 +2,30 @@
 Goal System - Manages short-term and long-term objectives with success evaluation
 """
 
+import sys
 import json
+import logging
 import time
+import heapq
 import threading
 from enum import Enum
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Callable
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Dict, List, Optional, Callable, Tuple, get_args, get_origin
 from datetime import datetime
+from collections import defaultdict
+from queue import SimpleQueue
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+# Ids are dense from 1, so the common ones are built (and interned) once
+_ID_CACHE = tuple(sys.intern(f"goal_{i}") for i in range(4096))
 
 
 class GoalStatus(Enum):
@@ -32,7 +49,34 @@ class GoalType(Enum):
     MILESTONE = "milestone"
 
 
-@dataclass
+def _compile_to_dict(cls, exclude: tuple = (), extra: Optional[Dict[str, str]] = None):
+    """Generate cls._td once from the dataclass fields.
+    
+    Enum fields are emitted as `.value` reads and lists of dataclasses as a
+    comprehension over the child's own _td, so serializing is a single flat
+    dict display with no per-call introspection or deep copies.
+    """
+    items = []
+    for f in fields(cls):
+        if f.name in exclude or f.name.startswith("_"):
+            continue
+        expr = f"self.{f.name}"
+        args = get_args(f.type)
+        if isinstance(f.type, type) and issubclass(f.type, Enum):
+            expr += ".value"
+        elif get_origin(f.type) is list and args and is_dataclass(args[0]):
+            expr = f"[item._td() for item in self.{f.name}]"
+        items.append(f"{f.name!r}: {expr}")
+    for key, expr in (extra or {}).items():
+        items.append(f"{key!r}: {expr}")
+    
+    source = "def _td(self):\n    return {" + ", ".join(items) + "}\n"
+    namespace: Dict = {}
+    exec(source, namespace)
+    cls._td = namespace["_td"]
+
+
+@dataclass(slots=True)
 class SuccessCriteria:
     description: str
     metric_type: str
@@ -51,16 +95,13 @@ class SuccessCriteria:
         return self.is_met
     
     def to_dict(self) -> dict:
-        return {
-            "description": self.description,
-            "metric_type": self.metric_type,
-            "target_value": self.target_value,
-            "current_value": self.current_value,
-            "is_met": self.is_met
-        }
+        return self._td()
+
 
+_compile_to_dict(SuccessCriteria)
 
-@dataclass
+
+@dataclass(slots=True)
 class Goal:
     id: str
     name: str
@@ -78,6 +119,17 @@ class Goal:
     progress: float = 0.0
     findings: List[str] = field(default_factory=list)
     metadata: Dict = field(default_factory=dict)
+    _child_progress_sum: float = field(default=0.0, init=False, repr=False, compare=False)
+    _completed_children: int = field(default=0, init=False, repr=False, compare=False)
+    _sort_key: int = field(default=0, init=False, repr=False, compare=False)
+    # Guards progress, findings, criteria and the child sums so independent
+    # goals can be updated without GoalSystem._lock
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Higher priority first, then older first (millisecond resolution),
+        # packed into one int so heap comparisons never touch tuples of floats
+        self._sort_key = (4 - self.priority.value) << 48 | int(self.created_at * 1000)
     
     def start(self):
         self.status = GoalStatus.IN_PROGRESS
@@ -106,41 +158,44 @@ class Goal:
         return None
     
     def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "goal_type": self.goal_type.value,
-            "priority": self.priority.value,
-            "status": self.status.value,
-            "parent_id": self.parent_id,
-            "sub_goals": self.sub_goals,
-            "success_criteria": [c.to_dict() for c in self.success_criteria],
-            "dependencies": self.dependencies,
-            "created_at": self.created_at,
-            "started_at": self.started_at,
-            "completed_at": self.completed_at,
-            "progress": self.progress,
-            "findings": self.findings,
-            "duration": self.get_duration()
-        }
+        return self._td()
+
+
+_compile_to_dict(Goal, exclude=("metadata",), extra={"duration": "self.get_duration()"})
 
 
 class GoalSystem:
     def __init__(self):
         self.goals: Dict[str, Goal] = {}
-        self.active_goals: List[str] = []
+        self.active_goals: Dict[str, None] = {}
         self.goal_history: List[str] = []
         self._lock = threading.Lock()
         self._next_id = 1
-        self._callbacks: Dict[str, List[Callable]] = {
-            "goal_created": [],
-            "goal_started": [],
-            "goal_completed": [],
-            "goal_failed": [],
-            "goal_updated": [],
-            "milestone_reached": []
+        self._status_counts: Dict[GoalStatus, int] = defaultdict(int)
+        self._by_type: Dict[GoalType, Dict[str, None]] = defaultdict(dict)
+        self._by_status: Dict[GoalStatus, Dict[str, None]] = defaultdict(dict)
+        # Pending goals ordered by (-priority, created_at, creation seq); entries
+        # for goals that have left PENDING are dropped lazily when popped
+        self._pending_heap: List[Tuple[int, int, str]] = []
+        # Dependency checks are memoized per goal until some goal enters or
+        # leaves COMPLETED
+        self._completion_version = 0
+        self._deps_cache: Dict[str, Tuple[int, bool]] = {}
+        # Immutable tuples swapped on registration so _notify can iterate
+        # without locking or copying
+        self._callbacks: Dict[str, Tuple[Callable, ...]] = {
+            "goal_created": (),
+            "goal_started": (),
+            "goal_completed": (),
+            "goal_failed": (),
+            "goal_updated": (),
+            "milestone_reached": ()
         }
+        self._callbacks_lock = threading.Lock()
+        # Callbacks run on a worker thread so slow listeners never stall
+        # callers holding self._lock; started on the first on()
+        self._event_q: SimpleQueue = SimpleQueue()
+        self._event_thread: Optional[threading.Thread] = None
     
     def create_goal(
         self,
@@ -153,8 +208,16 @@ class GoalSystem:
         dependencies: Optional[List[str]] = None
     ) -> Goal:
         with self._lock:
-            goal_id = f"goal_{self._next_id}"
+            seq = self._next_id
+            # Interned so the many dict lookups keyed by id hash once and
+            # compare by identity
+            if seq < len(_ID_CACHE):
+                goal_id = _ID_CACHE[seq]
+            else:
+                goal_id = sys.intern(f"goal_{seq}")
             self._next_id += 1
+            if parent_id:
+                parent_id = sys.intern(parent_id)
             
             goal = Goal(
                 id=goal_id,
@@ -164,10 +227,14 @@ class GoalSystem:
                 priority=priority,
                 parent_id=parent_id,
                 success_criteria=success_criteria or [],
-                dependencies=dependencies or []
+                dependencies=[sys.intern(d) for d in dependencies] if dependencies else []
             )
             
             self.goals[goal_id] = goal
+            self._status_counts[goal.status] += 1
+            self._by_type[goal_type][goal_id] = None
+            self._by_status[goal.status][goal_id] = None
+            heapq.heappush(self._pending_heap, (goal._sort_key, seq, goal_id))
             
             if parent_id and parent_id in self.goals:
                 self.goals[parent_id].sub_goals.append(goal_id)
@@ -215,9 +282,9 @@ class GoalSystem:
                     if dep_goal.status != GoalStatus.COMPLETED:
                         return False
             
+            self._transition(goal, GoalStatus.IN_PROGRESS)
             goal.start()
-            if goal_id not in self.active_goals:
-                self.active_goals.append(goal_id)
+            self.active_goals[goal_id] = None
             
             self._notify("goal_started", goal)
             return True
@@ -228,10 +295,14 @@ class GoalSystem:
                 return False
             
             goal = self.goals[goal_id]
-            goal.complete(success)
+            self._transition(goal, GoalStatus.COMPLETED if success else GoalStatus.FAILED)
+            with goal._lock:
+                old_progress = goal.progress
+                goal.complete(success)
+                delta = goal.progress - old_progress
+            self._propagate_progress(goal, delta)
             
-            if goal_id in self.active_goals:
-                self.active_goals.remove(goal_id)
+            self.active_goals.pop(goal_id, None)
             
             self.goal_history.append(goal_id)
             
@@ -243,17 +314,30 @@ class GoalSystem:
             
             return True
     
+    def _transition(self, goal: Goal, new_status: GoalStatus):
+        # Caller must hold self._lock and apply the status change itself
+        old_status = goal.status
+        if old_status is not new_status:
+            self._status_counts[old_status] -= 1
+            self._status_counts[new_status] += 1
+            self._by_status[old_status].pop(goal.id, None)
+            self._by_status[new_status][goal.id] = None
+            if GoalStatus.COMPLETED in (old_status, new_status):
+                self._completion_version += 1
+                parent = self.goals.get(goal.parent_id) if goal.parent_id else None
+                if parent is not None:
+                    parent._completed_children += 1 if new_status is GoalStatus.COMPLETED else -1
+    
     def update_goal_progress(self, goal_id: str, progress: float):
-        with self._lock:
-            if goal_id in self.goals:
-                goal = self.goals[goal_id]
-                goal.update_progress(progress)
-                self._notify("goal_updated", goal)
+        goal = self.goals.get(goal_id)
+        if goal is not None:
+            self._set_progress(goal, progress)
+            self._notify("goal_updated", goal)
     
     def add_finding_to_goal(self, goal_id: str, finding: str):
-        with self._lock:
-            if goal_id in self.goals:
-                goal = self.goals[goal_id]
+        goal = self.goals.get(goal_id)
+        if goal is not None:
+            with goal._lock:
                 goal.add_finding(finding)
                 
                 for criteria in goal.success_criteria:
@@ -261,73 +345,108 @@ class GoalSystem:
                         criteria.evaluate(len(goal.findings))
     
     def evaluate_goal(self, goal_id: str) -> bool:
-        if goal_id not in self.goals:
-            return False
-        
-        goal = self.goals[goal_id]
-        
-        if goal.sub_goals:
-            completed_sub = sum(
-                1 for sg_id in goal.sub_goals
-                if sg_id in self.goals and 
-                self.goals[sg_id].status == GoalStatus.COMPLETED
-            )
-            total_sub = len(goal.sub_goals)
-            goal.update_progress((completed_sub / total_sub) * 100 if total_sub > 0 else 0)
-        
-        return goal.evaluate_success()
+        with self._lock:
+            goal = self.goals.get(goal_id)
+            if goal is None:
+                return False
+            
+            if goal.sub_goals:
+                self._set_progress(goal, (goal._completed_children / len(goal.sub_goals)) * 100)
+            
+            with goal._lock:
+                return goal.evaluate_success()
+    
+    def _set_progress(self, goal: Goal, progress: float):
+        with goal._lock:
+            old_progress = goal.progress
+            goal.update_progress(progress)
+            delta = goal.progress - old_progress
+        self._propagate_progress(goal, delta)
+    
+    def _propagate_progress(self, goal: Goal, delta: float):
+        # Keeps the parent's running child sum in step so
+        # _update_parent_progress never has to re-walk its sub_goals. Goal
+        # locks are never nested, so child and parent updates cannot deadlock.
+        if goal.parent_id and delta:
+            parent = self.goals.get(goal.parent_id)
+            if parent is not None:
+                with parent._lock:
+                    parent._child_progress_sum += delta
     
     def _update_parent_progress(self, parent_id: str):
-        if parent_id not in self.goals:
-            return
-        
-        parent = self.goals[parent_id]
-        if not parent.sub_goals:
+        parent = self.goals.get(parent_id)
+        if parent is None or not parent.sub_goals:
             return
         
-        total_progress = 0.0
-        for sg_id in parent.sub_goals:
-            if sg_id in self.goals:
-                total_progress += self.goals[sg_id].progress
+        with parent._lock:
+            avg_progress = parent._child_progress_sum / len(parent.sub_goals)
+        if avg_progress > 100.0 - 1e-9:
+            # Float drift in the running sum must not keep a fully completed
+            # parent just under 100
+            avg_progress = 100.0
+        self._set_progress(parent, avg_progress)
         
-        avg_progress = total_progress / len(parent.sub_goals)
-        parent.update_progress(avg_progress)
-        
-        if avg_progress >= 100.0 and parent.evaluate_success():
+        with parent._lock:
+            reached = avg_progress >= 100.0 and parent.evaluate_success()
+        if reached:
             self._notify("milestone_reached", parent)
     
     def get_goal(self, goal_id: str) -> Optional[Goal]:
         return self.goals.get(goal_id)
     
     def get_active_goals(self) -> List[Goal]:
-        return [self.goals[gid] for gid in self.active_goals if gid in self.goals]
+        return [self.goals[gid] for gid in tuple(self.active_goals) if gid in self.goals]
     
     def get_goals_by_type(self, goal_type: GoalType) -> List[Goal]:
-        return [g for g in self.goals.values() if g.goal_type == goal_type]
+        return [self.goals[gid] for gid in tuple(self._by_type.get(goal_type, ()))]
     
     def get_pending_goals(self) -> List[Goal]:
-        return [g for g in self.goals.values() if g.status == GoalStatus.PENDING]
+        return [self.goals[gid] for gid in tuple(self._by_status.get(GoalStatus.PENDING, ()))]
     
     def get_next_goal(self) -> Optional[Goal]:
-        pending = self.get_pending_goals()
-        pending.sort(key=lambda g: (-g.priority.value, g.created_at))
+        with self._lock:
+            heap = self._pending_heap
+            skipped = []
+            next_goal = None
+            
+            while heap:
+                entry = heapq.heappop(heap)
+                goal = self.goals.get(entry[2])
+                if goal is None or goal.status is not GoalStatus.PENDING:
+                    continue
+                skipped.append(entry)
+                if self._deps_satisfied(goal):
+                    next_goal = goal
+                    break
+            
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+            
+            return next_goal
+    
+    def _deps_satisfied(self, goal: Goal) -> bool:
+        # Caller must hold self._lock
+        cached = self._deps_cache.get(goal.id)
+        if cached is not None and cached[0] == self._completion_version:
+            return cached[1]
         
-        for goal in pending:
-            deps_satisfied = all(
-                self.goals.get(dep_id, Goal("", "", "", GoalType.SHORT_TERM, GoalPriority.LOW)).status == GoalStatus.COMPLETED
-                for dep_id in goal.dependencies
-            )
-            if deps_satisfied:
-                return goal
+        satisfied = True
+        for dep_id in goal.dependencies:
+            dep_goal = self.goals.get(dep_id)
+            if dep_goal is None or dep_goal.status is not GoalStatus.COMPLETED:
+                satisfied = False
+                break
         
-        return None
+        self._deps_cache[goal.id] = (self._completion_version, satisfied)
+        return satisfied
     
     def get_summary(self) -> dict:
         total = len(self.goals)
-        completed = sum(1 for g in self.goals.values() if g.status == GoalStatus.COMPLETED)
-        failed = sum(1 for g in self.goals.values() if g.status == GoalStatus.FAILED)
-        in_progress = sum(1 for g in self.goals.values() if g.status == GoalStatus.IN_PROGRESS)
-        pending = sum(1 for g in self.goals.values() if g.status == GoalStatus.PENDING)
+        counts = self._status_counts
+        completed = counts[GoalStatus.COMPLETED]
+        failed = counts[GoalStatus.FAILED]
+        in_progress = counts[GoalStatus.IN_PROGRESS]
+        pending = counts[GoalStatus.PENDING]
         
         return {
             "total": total,
@@ -340,25 +459,49 @@ class GoalSystem:
         }
     
     def on(self, event: str, callback: Callable):
-        if event in self._callbacks:
-            self._callbacks[event].append(callback)
+        with self._callbacks_lock:
+            if event in self._callbacks:
+                self._callbacks[event] = self._callbacks[event] + (callback,)
+                if self._event_thread is None:
+                    self._event_thread = threading.Thread(target=self._event_pump, daemon=True)
+                    self._event_thread.start()
     
     def _notify(self, event: str, goal: Goal):
-        for callback in self._callbacks.get(event, []):
-            try:
-                callback(goal)
-            except Exception as e:
-                print(f"Goal callback error: {e}")
+        callbacks = self._callbacks.get(event)
+        if callbacks:
+            self._event_q.put((callbacks, goal))
+    
+    def _event_pump(self):
+        while True:
+            callbacks, goal = self._event_q.get()
+            for callback in callbacks:
+                try:
+                    callback(goal)
+                except Exception:
+                    logger.exception("Goal callback error")
     
     def export_goals(self, filepath: str):
-        with open(filepath, "w") as f:
-            json.dump({
-                "goals": {gid: g.to_dict() for gid, g in self.goals.items()},
-                "summary": self.get_summary()
-            }, f, indent=2)
+        payload = {
+            "goals": {gid: g.to_dict() for gid, g in self.goals.items()},
+            "summary": self.get_summary()
+        }
+        # Serialize in one shot and write once; json.dump streams one
+        # write() per token
+        if ORJSON_AVAILABLE:
+            data = orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(payload, indent=2).encode()
+        with open(filepath, "wb") as f:
+            f.write(data)
     
     def clear(self):
         with self._lock:
             self.goals.clear()
+            self._status_counts.clear()
+            self._by_type.clear()
+            self._by_status.clear()
+            self._pending_heap.clear()
+            self._deps_cache.clear()
+            self._completion_version += 1
             self.active_goals.clear()
             self.goal_history.clear()
@@ -3,14 +3,37 @@ LLM Client - Handles communication with OpenRouter API
 """
 
 import os
+import re
 import json
 import time
+import asyncio
 import threading
-from typing import Dict, List, Optional, Callable
+import weakref
+from collections import deque
+from typing import Dict, List, Optional, Callable, Tuple
 from dataclasses import dataclass
+from types import MappingProxyType
 
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
 
-@dataclass
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+
+@dataclass(frozen=True, slots=True)
 class ModelConfig:
     id: str
     name: str
@@ -25,19 +48,67 @@ AVAILABLE_MODELS = [
     ModelConfig("custom", "Custom Model", "Custom", 4096),
 ]
 
+_AVAILABLE_MODELS_MAP = MappingProxyType({m.id: m for m in AVAILABLE_MODELS})
+
+# Only the most recent turns are resent; the model's context is finite anyway
+_MAX_HISTORY_MESSAGES = 64
+# Rough characters-per-token ratio used to keep history inside the context
+_CHARS_PER_TOKEN = 4
+
+# A stripped line starting with "RUN "; \s stops at newlines so each match
+# stays on its own line, mirroring the old split/strip/startswith loop
+_RUN_RE = re.compile(r"^[^\S\n]*(RUN .*\S)[^\S\n]*$", re.MULTILINE)
+
+_DEFAULT_HEADERS = {
+    "Content-Type": "application/json",
+    "HTTP-Referer": "https://ax-shell.local",
+    "X-Title": "Ax-Shell AI Agent"
+}
+
+
+
+def _dumps(obj) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def _loads(data: bytes):
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 class LLMClient:
     def __init__(self, api_key: str = None, model_id: str = "openai/gpt-4o"):
         self.api_key = api_key or os.getenv("OPENROUTER_API_KEY", "")
+        # Full header set built once; only Authorization changes, in set_api_key
+        self._headers: Dict[str, str] = {
+            **_DEFAULT_HEADERS,
+            "Authorization": f"Bearer {self.api_key}"
+        }
         self.model_id = model_id
         self.base_url = "https://openrouter.ai/api/v1"
-        self.conversation_history: List[Dict] = []
+        self.conversation_history: deque = deque(maxlen=_MAX_HISTORY_MESSAGES)
+        # Guards conversation_history; sync and async callers may run on
+        # different threads and event loops at once
         self._lock = threading.Lock()
-        self._callbacks: Dict[str, List[Callable]] = {
-            "response": [],
-            "error": [],
-            "stream": []
+        # One pooled keep-alive session per client so consecutive calls reuse
+        # the TCP/TLS connection instead of handshaking every time
+        self._session = requests.Session() if REQUESTS_AVAILABLE else None
+        if self._session is not None:
+            self._session.headers.update(self._headers)
+        # An httpx client is bound to the event loop it was first used on,
+        # so chat_async keeps one per loop
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._system_msg: Optional[Dict[str, str]] = None
+        # Copy-on-write: on() rebinds a new tuple, readers never lock
+        self._callbacks: Dict[str, Tuple[Callable, ...]] = {
+            "response": (),
+            "error": (),
+            "stream": ()
         }
+        self._callbacks_lock = threading.Lock()
         
         self.system_prompt = """You are an autonomous AI agent coordinator. Your task is to:
 1. Analyze the user's target and objectives
@@ -57,6 +128,12 @@ Important rules:
     
     def set_api_key(self, api_key: str):
         self.api_key = api_key
+        auth = {"Authorization": f"Bearer {api_key}"}
+        self._headers.update(auth)
+        if self._session is not None:
+            self._session.headers.update(auth)
+        for client in list(self._async_clients.values()):
+            client.headers.update(auth)
     
     def set_model(self, model_id: str):
         self.model_id = model_id
@@ -64,23 +141,17 @@ Important rules:
     def get_available_models(self) -> List[ModelConfig]:
         return AVAILABLE_MODELS
     
+    def get_model_config(self) -> ModelConfig:
+        return _AVAILABLE_MODELS_MAP.get(self.model_id, _AVAILABLE_MODELS_MAP["custom"])
+    
     def parse_commands(self, response: str) -> Dict[str, str]:
-        commands = {}
-        lines = response.strip().split('\n')
-        index = 1
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith("RUN "):
-                commands[str(index)] = line
-                index += 1
-        
-        return commands
+        return {str(i): cmd for i, cmd in enumerate(_RUN_RE.findall(response), 1)}
     
     def check_end_signal(self, response: str) -> bool:
         return "<END!>" in response
     
-    def generate_plan(self, target: str, category: str, mode: str, instructions: str = "") -> str:
+    def generate_plan(self, target: str, category: str, mode: str, instructions: str = "",
+                      stream: bool = False) -> str:
         prompt = f"""Target: {target}
 Category: {category}
 Mode: {mode}
@@ -95,9 +166,12 @@ Consider:
 - Parallel execution opportunities
 - Information gathering sequence
 """
+        if stream:
+            return self._stream_message(prompt)
         return self._send_message(prompt)
     
-    def continue_execution(self, findings: List[str], remaining_objectives: str) -> str:
+    def continue_execution(self, findings: List[str], remaining_objectives: str,
+                           stream: bool = False) -> str:
         findings_text = "\n".join(findings)
         prompt = f"""Current findings:
 {findings_text}
@@ -108,76 +182,193 @@ Based on current findings, generate the next batch of commands.
 Output: RUN <command>
 Or if complete: <END!>
 """
+        if stream:
+            return self._stream_message(prompt)
         return self._send_message(prompt)
     
     def chat(self, message: str) -> str:
         return self._send_message(message)
     
-    def _send_message(self, message: str) -> str:
+    def chat_stream(self, message: str) -> str:
+        """Like chat(), but each complete RUN line is emitted through the
+        "stream" callback as soon as it arrives."""
+        return self._stream_message(message)
+    
+    async def chat_async(self, message: str) -> str:
+        """Async variant of chat() so callers can asyncio.gather() many
+        requests and overlap their network round-trips."""
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(self._send_message, message)
+        
         try:
-            import requests
+            data = self._build_payload(message)
             
-            self.conversation_history.append({
-                "role": "user",
-                "content": message
-            })
+            loop = asyncio.get_running_loop()
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = httpx.AsyncClient(timeout=120, headers=self._headers)
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": "https://ax-shell.local",
-                "X-Title": "Ax-Shell AI Agent"
-            }
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                content=_dumps(data)
+            )
             
-            data = {
-                "model": self.model_id,
-                "messages": [
-                    {"role": "system", "content": self.system_prompt},
-                    *self.conversation_history
-                ]
-            }
+            return self._handle_response(response, message)
+        
+        except Exception as e:
+            error = f"Request Error: {str(e)}"
+            self._notify("error", error)
+            return error
+    
+    def _send_message(self, message: str) -> str:
+        try:
+            if self._session is None:
+                raise ImportError("requests is not installed")
             
-            response = requests.post(
+            data = self._build_payload(message)
+            
+            response = self._session.post(
                 f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=data,
+                data=_dumps(data),
                 timeout=120
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                assistant_message = result["choices"][0]["message"]["content"]
+            return self._handle_response(response, message)
+                
+        except Exception as e:
+            error = f"Request Error: {str(e)}"
+            self._notify("error", error)
+            return error
+    
+    def _stream_message(self, message: str) -> str:
+        try:
+            if self._session is None:
+                raise ImportError("requests is not installed")
+            
+            data = self._build_payload(message)
+            data["stream"] = True
+            
+            response = self._session.post(
+                f"{self.base_url}/chat/completions",
+                data=_dumps(data),
+                timeout=120,
+                stream=True
+            )
+            
+            with response:
+                if response.status_code != 200:
+                    return self._handle_response(response, message)
                 
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "content": assistant_message
-                })
+                parts: List[str] = []
+                pending = ""
+                for raw in response.iter_lines():
+                    # SSE frames look like b"data: {...}"; comments and blank
+                    # keep-alive lines are skipped
+                    if not raw.startswith(b"data:"):
+                        continue
+                    chunk = raw[5:].strip()
+                    if chunk == b"[DONE]":
+                        break
+                    
+                    delta = _loads(chunk)["choices"][0].get("delta", {}).get("content")
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    
+                    pending += delta
+                    if "\n" in pending:
+                        *complete, pending = pending.split("\n")
+                        self._emit_commands(complete)
                 
-                self._notify("response", assistant_message)
-                return assistant_message
-            else:
-                error = f"API Error: {response.status_code} - {response.text}"
-                self._notify("error", error)
-                return error
+                self._emit_commands([pending])
+            
+            assistant_message = "".join(parts)
+            self._record_turn(message, assistant_message)
+            
+            self._notify("response", assistant_message)
+            return assistant_message
                 
         except Exception as e:
             error = f"Request Error: {str(e)}"
             self._notify("error", error)
             return error
     
+    def _emit_commands(self, lines: List[str]):
+        for line in lines:
+            line = line.strip()
+            if line.startswith("RUN "):
+                self._notify("stream", line)
+    
+    def _build_payload(self, message: str) -> dict:
+        # The history is snapshotted here and the turn is only recorded once
+        # the reply arrives, so concurrent requests never interleave
+        budget = self.get_model_config().max_tokens * _CHARS_PER_TOKEN
+        with self._lock:
+            history = self.conversation_history
+            total = len(message) + sum(len(m["content"]) for m in history)
+            while total > budget and history:
+                total -= len(history.popleft()["content"])
+            messages = [self._system_message(), *history, {"role": "user", "content": message}]
+        
+        return {
+            "model": self.model_id,
+            "messages": messages
+        }
+    
+    def _record_turn(self, message: str, assistant_message: str):
+        with self._lock:
+            self.conversation_history.extend((
+                {"role": "user", "content": message},
+                {"role": "assistant", "content": assistant_message}
+            ))
+    
+    def _system_message(self) -> Dict[str, str]:
+        # Rebuilt only when the prompt changes
+        if self._system_msg is None or self._system_msg["content"] is not self.system_prompt:
+            self._system_msg = {"role": "system", "content": self.system_prompt}
+        return self._system_msg
+    
+    def _handle_response(self, response, message: str) -> str:
+        # Works for both requests and httpx responses
+        if response.status_code == 200:
+            result = _loads(response.content)
+            assistant_message = result["choices"][0]["message"]["content"]
+            
+            self._record_turn(message, assistant_message)
+            
+            self._notify("response", assistant_message)
+            return assistant_message
+        else:
+            error = f"API Error: {response.status_code} - {response.text}"
+            self._notify("error", error)
+            return error
+    
     def on(self, event: str, callback: Callable):
-        if event in self._callbacks:
-            self._callbacks[event].append(callback)
+        with self._callbacks_lock:
+            if event in self._callbacks:
+                self._callbacks[event] = self._callbacks[event] + (callback,)
     
     def _notify(self, event: str, data):
-        for callback in self._callbacks.get(event, []):
+        for callback in self._callbacks.get(event, ()):
             try:
                 callback(data)
             except Exception as e:
                 print(f"Callback error: {e}")
     
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+    
+    async def aclose(self):
+        """Close the async client belonging to the running event loop."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
     def reset_conversation(self):
-        self.conversation_history = []
+        with self._lock:
+            self.conversation_history.clear()
     
     def set_system_prompt(self, prompt: str):
         self.system_prompt = prompt
+        self._system_msg = None
@@ -3,17 +3,123 @@ Memory System - Short-term context and long-term knowledge base for persistent A
 """
 
 import json
+import hashlib
+import heapq
+import logging
+import mmap
 import os
+import re
 import time
 import threading
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
 from datetime import datetime
-from collections import deque
-import hashlib
+from collections import deque, defaultdict, OrderedDict
+from functools import lru_cache
+from .text_index import SubstringIndex
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+_RETRIEVE_CACHE_SIZE = 256
+_RETRIEVE_CACHE_TTL = 60.0
+# Match sets larger than this are recomputed rather than kept in the cache
+_RETRIEVE_CACHE_MAX_IDS = 1024
+_SEVERITY_IMPORTANCE: Dict[str, float] = {
+    "critical": 1.0,
+    "high": 0.8,
+    "medium": 0.6,
+    "low": 0.4,
+    "info": 0.2
+}
+_FOCUS_PREFIX = "Current Focus: "
+_WORKING_CONTEXT_HEADER = "Working Context:\n"
+_RECENT_FINDINGS_HEADER = "Recent Findings:\n"
+_SECTION_SEP = "\n\n"
+_LOG_FILENAME = "memories.log"
+# Appends are buffered and flushed shortly after the first unflushed write
+_LOG_FLUSH_DELAY = 0.5
+
+
+def _dumps(obj, indent: bool = False) -> bytes:
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def _loads(data):
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # e.g. NaN/Infinity, which the stdlib encoder used to write
+            pass
+    return json.loads(data)
+
 
+def _rank_key(entry: "MemoryEntry"):
+    return (-entry.importance, -entry.access_count, -entry.timestamp)
 
-@dataclass
+
+@lru_cache(maxsize=256)
+def _read_blob(path: str) -> str:
+    # Blobs are content-addressed and never rewritten, so caching by path is safe
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+class _RWLock:
+    """Many concurrent readers or one writer. Waiting writers block new
+    readers so a steady read load cannot starve them. Not reentrant."""
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+    
+    @contextmanager
+    def rlock(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+    
+    @contextmanager
+    def wlock(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+@dataclass(slots=True)
 class MemoryEntry:
     id: str
     content: str
@@ -25,6 +131,11 @@ class MemoryEntry:
     last_accessed: float = field(default_factory=time.time)
     metadata: Dict = field(default_factory=dict)
     embedding: Optional[List[float]] = None
+    # Computed once; every substring match in retrieve compares against it
+    content_lower: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.content_lower = self.content.lower()
     
     def access(self):
         self.access_count += 1
@@ -44,7 +155,7 @@ class MemoryEntry:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationTurn:
     role: str
     content: str
@@ -63,29 +174,37 @@ class ShortTermMemory:
     def __init__(self, max_turns: int = 50, max_tokens: int = 8000):
         self.conversation: deque = deque(maxlen=max_turns)
         self.working_context: Dict[str, Any] = {}
+        # Parallel to working_context: key -> last update time
+        self._context_ts: Dict[str, float] = {}
         self.recent_findings: deque = deque(maxlen=20)
         self.current_focus: Optional[str] = None
         self.max_tokens = max_tokens
-        self._lock = threading.Lock()
+        self._total_tokens = 0
+        self._lock = _RWLock()
     
     def add_turn(self, role: str, content: str):
-        with self._lock:
+        with self._lock.wlock():
             turn = ConversationTurn(
                 role=role,
                 content=content,
                 tokens=len(content.split())
             )
-            self.conversation.append(turn)
+            conversation = self.conversation
+            if len(conversation) == conversation.maxlen:
+                # append() is about to evict the oldest turn
+                self._total_tokens -= conversation[0].tokens
+            conversation.append(turn)
+            self._total_tokens += turn.tokens
             self._trim_to_token_limit()
     
     def _trim_to_token_limit(self):
-        total_tokens = sum(turn.tokens for turn in self.conversation)
-        while total_tokens > self.max_tokens and len(self.conversation) > 2:
+        # Caller must hold self._lock for writing
+        while self._total_tokens > self.max_tokens and len(self.conversation) > 2:
             removed = self.conversation.popleft()
-            total_tokens -= removed.tokens
+            self._total_tokens -= removed.tokens
     
     def add_finding(self, finding: str, severity: str = "info"):
-        with self._lock:
+        with self._lock.wlock():
             self.recent_findings.append({
                 "content": finding,
                 "severity": severity,
@@ -93,41 +212,44 @@ class ShortTermMemory:
             })
     
     def set_context(self, key: str, value: Any):
-        with self._lock:
-            self.working_context[key] = {
-                "value": value,
-                "updated_at": time.time()
-            }
+        with self._lock.wlock():
+            self.working_context[key] = value
+            self._context_ts[key] = time.time()
     
     def get_context(self, key: str) -> Optional[Any]:
-        ctx = self.working_context.get(key)
-        return ctx["value"] if ctx else None
+        with self._lock.rlock():
+            return self.working_context.get(key)
     
     def set_focus(self, focus: str):
         self.current_focus = focus
     
     def get_conversation_history(self, last_n: Optional[int] = None) -> List[dict]:
-        turns = list(self.conversation)
+        with self._lock.rlock():
+            turns = list(self.conversation)
         if last_n:
             turns = turns[-last_n:]
         return [t.to_dict() for t in turns]
     
     def get_recent_findings(self) -> List[dict]:
-        return list(self.recent_findings)
+        with self._lock.rlock():
+            return list(self.recent_findings)
     
     def get_summary(self) -> dict:
-        return {
-            "conversation_turns": len(self.conversation),
-            "total_tokens": sum(t.tokens for t in self.conversation),
-            "working_context_keys": list(self.working_context.keys()),
-            "recent_findings": len(self.recent_findings),
-            "current_focus": self.current_focus
-        }
+        with self._lock.rlock():
+            return {
+                "conversation_turns": len(self.conversation),
+                "total_tokens": self._total_tokens,
+                "working_context_keys": list(self.working_context.keys()),
+                "recent_findings": len(self.recent_findings),
+                "current_focus": self.current_focus
+            }
     
     def clear(self):
-        with self._lock:
+        with self._lock.wlock():
             self.conversation.clear()
+            self._total_tokens = 0
             self.working_context.clear()
+            self._context_ts.clear()
             self.recent_findings.clear()
             self.current_focus = None
 
@@ -138,16 +260,43 @@ class LongTermMemory:
         self.memories: Dict[str, MemoryEntry] = {}
         self.knowledge_base: Dict[str, Dict] = {}
         self.target_history: Dict[str, List[dict]] = {}
-        self._lock = threading.Lock()
-        self._next_id = 1
+        self._lock = _RWLock()
+        # Readers still touch the retrieve cache and access counters, so
+        # those get a small lock of their own
+        self._access_lock = threading.Lock()
+        # token -> ids of entries whose lowercased content contains it
+        self._index: Dict[str, Set[str]] = defaultdict(set)
+        # The index's tokens by substring, for query words that are only
+        # part of a stored word
+        self._vocabulary = SubstringIndex()
+        self._entry_order: Dict[str, int] = {}
+        # lowercase severity -> finding ids, kept in insertion order
+        self._findings_by_severity: Dict[str, Dict[str, None]] = defaultdict(dict)
+        # (query_lower, entry_type, version) -> (cached_at, matched ids); the
+        # version moves on every write so stale results are never served
+        self._version = 0
+        self._retrieve_cache: "OrderedDict[tuple, Tuple[float, Tuple[str, ...]]]" = OrderedDict()
+        # Entries are appended to one JSONL log; the writer has its own lock
+        # so disk I/O never holds up readers of self.memories
+        self._log_path = os.path.join(storage_path, _LOG_FILENAME)
+        self._log = None
+        self._write_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        # knowledge_base.json is rewritten at most once per flush delay
+        self._kb_lock = threading.Lock()
+        self._kb_dirty = False
+        self._kb_flush_timer: Optional[threading.Timer] = None
         
         self._ensure_storage()
         self._load_from_disk()
+        if self._log is None:
+            self._log = open(self._log_path, "ab", buffering=1 << 16)
     
     def _ensure_storage(self):
         os.makedirs(self.storage_path, exist_ok=True)
         os.makedirs(os.path.join(self.storage_path, "findings"), exist_ok=True)
         os.makedirs(os.path.join(self.storage_path, "targets"), exist_ok=True)
+        os.makedirs(os.path.join(self.storage_path, "blobs"), exist_ok=True)
     
     def store(
         self,
@@ -157,42 +306,110 @@ class LongTermMemory:
         importance: float = 0.5,
         metadata: Optional[Dict] = None
     ) -> MemoryEntry:
-        with self._lock:
-            entry_id = self._generate_id(content)
-            
-            entry = MemoryEntry(
-                id=entry_id,
-                content=content,
-                entry_type=entry_type,
-                source=source,
-                importance=importance,
-                metadata=metadata or {}
-            )
-            
+        # Hashing, tokenizing and the disk append all happen outside the
+        # write lock, which only covers the dict and index inserts
+        entry_id = self._generate_id(content)
+        
+        entry = MemoryEntry(
+            id=entry_id,
+            content=content,
+            entry_type=entry_type,
+            source=source,
+            importance=importance,
+            metadata=metadata or {}
+        )
+        tokens = set(_TOKEN_RE.findall(entry.content_lower))
+        
+        with self._lock.wlock():
             self.memories[entry_id] = entry
-            self._save_entry(entry)
-            
-            return entry
+            self._index_entry(entry, tokens)
+        
+        self._save_entry(entry)
+        return entry
+    
+    def _index_entry(self, entry: MemoryEntry, tokens: Optional[Set[str]] = None):
+        # Caller must hold self._lock for writing
+        if tokens is None:
+            tokens = set(_TOKEN_RE.findall(entry.content_lower))
+        self._entry_order.setdefault(entry.id, len(self._entry_order))
+        self._version += 1
+        index = self._index
+        for token in tokens:
+            if token not in index:
+                self._vocabulary.add(token)
+            index[token].add(entry.id)
+        if entry.entry_type == "finding":
+            severity = entry.metadata.get("severity", "")
+            if isinstance(severity, str):
+                self._findings_by_severity[severity.lower()][entry.id] = None
     
     def _generate_id(self, content: str) -> str:
-        hash_input = f"{content}{time.time()}{self._next_id}"
-        self._next_id += 1
-        return hashlib.sha256(hash_input.encode()).hexdigest()[:16]
+        # 64 random bits in the same 16-hex-char shape as the old truncated
+        # SHA-256 ids, without hashing the (possibly large) content
+        return os.urandom(8).hex()
     
     def retrieve(self, query: str, entry_type: Optional[str] = None, limit: int = 10) -> List[MemoryEntry]:
-        results = []
         query_lower = query.lower()
         
-        for entry in self.memories.values():
-            if entry_type and entry.entry_type != entry_type:
-                continue
-            
-            if query_lower in entry.content.lower():
+        with self._lock.rlock():
+            results = [self.memories[entry_id] for entry_id in self._cached_match(query_lower, entry_type)]
+        
+        with self._access_lock:
+            for entry in results:
                 entry.access()
-                results.append(entry)
         
-        results.sort(key=lambda e: (-e.importance, -e.access_count, -e.timestamp))
-        return results[:limit]
+        if limit < 0:
+            results.sort(key=_rank_key)
+            return results[:limit]
+        # Same order as a stable sort, but only `limit` entries are kept ranked
+        return heapq.nsmallest(limit, results, key=_rank_key)
+    
+    def _cached_match(self, query_lower: str, entry_type: Optional[str]) -> Tuple[str, ...]:
+        # Caller must hold self._lock for reading. Only the match set is
+        # cached: ranking depends on access counts, which every retrieve changes.
+        key = (query_lower, entry_type, self._version)
+        now = time.monotonic()
+        with self._access_lock:
+            cached = self._retrieve_cache.get(key)
+            if cached is not None and now - cached[0] < _RETRIEVE_CACHE_TTL:
+                self._retrieve_cache.move_to_end(key)
+                return cached[1]
+        
+        ids = tuple(
+            entry_id
+            for entry_id in sorted(self._match_ids(query_lower), key=self._entry_order.__getitem__)
+            if not entry_type or self.memories[entry_id].entry_type == entry_type
+        )
+        
+        if len(ids) <= _RETRIEVE_CACHE_MAX_IDS:
+            with self._access_lock:
+                self._retrieve_cache[key] = (now, ids)
+                self._retrieve_cache.move_to_end(key)
+                if len(self._retrieve_cache) > _RETRIEVE_CACHE_SIZE:
+                    self._retrieve_cache.popitem(last=False)
+        return ids
+    
+    def _match_ids(self, query_lower: str) -> Set[str]:
+        # Caller must hold self._lock for reading
+        query_tokens = set(_TOKEN_RE.findall(query_lower))
+        
+        if query_tokens:
+            # Each query word lies inside a single content token, so postings of
+            # the tokens containing it give a candidate superset to verify exactly
+            index = self._index
+            candidates: Optional[Set[str]] = None
+            for query_token in sorted(query_tokens, key=len, reverse=True):
+                postings: Set[str] = set()
+                for token in self._vocabulary.tokens_containing(query_token):
+                    postings |= index[token]
+                candidates = postings if candidates is None else candidates & postings
+                if not candidates:
+                    return set()
+        else:
+            candidates = self.memories.keys()
+        
+        memories = self.memories
+        return {entry_id for entry_id in candidates if query_lower in memories[entry_id].content_lower}
     
     def store_finding(
         self,
@@ -202,16 +419,18 @@ class LongTermMemory:
         tool: str,
         raw_output: str = ""
     ):
+        # Repeated scans tend to produce identical output, so the text is
+        # stored once by hash and entries only carry the hash and a preview
+        raw_output = raw_output[:1000]
         metadata = {
             "target": target,
             "severity": severity,
             "tool": tool,
-            "raw_output": raw_output[:1000]
+            "raw_output_hash": self._store_blob(raw_output.encode("utf-8")) if raw_output else None,
+            "raw_output_preview": raw_output[:200]
         }
         
-        importance = {"critical": 1.0, "high": 0.8, "medium": 0.6, "low": 0.4, "info": 0.2}.get(
-            severity.lower(), 0.5
-        )
+        importance = _SEVERITY_IMPORTANCE.get(severity.lower(), 0.5)
         
         self.store(
             content=finding,
@@ -221,26 +440,50 @@ class LongTermMemory:
             metadata=metadata
         )
         
-        if target not in self.target_history:
-            self.target_history[target] = []
-        
-        self.target_history[target].append({
-            "finding": finding,
-            "severity": severity,
-            "tool": tool,
-            "timestamp": time.time()
-        })
+        with self._lock.wlock():
+            if target not in self.target_history:
+                self.target_history[target] = []
+            
+            self.target_history[target].append({
+                "finding": finding,
+                "severity": severity,
+                "tool": tool,
+                "timestamp": time.time()
+            })
+    
+    def _store_blob(self, data: bytes) -> str:
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        path = os.path.join(self.storage_path, "blobs", f"{digest}.bin")
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+    
+    def get_raw_output(self, entry: MemoryEntry) -> str:
+        if "raw_output" in entry.metadata:
+            # Entries written before blobs existed carry the text inline
+            return entry.metadata["raw_output"]
+        digest = entry.metadata.get("raw_output_hash")
+        if not digest:
+            return ""
+        try:
+            return _read_blob(os.path.join(self.storage_path, "blobs", f"{digest}.bin"))
+        except OSError:
+            return entry.metadata.get("raw_output_preview", "")
     
     def store_knowledge(self, category: str, key: str, value: Any):
-        if category not in self.knowledge_base:
-            self.knowledge_base[category] = {}
-        
-        self.knowledge_base[category][key] = {
-            "value": value,
-            "updated_at": time.time()
-        }
+        with self._lock.wlock():
+            if category not in self.knowledge_base:
+                self.knowledge_base[category] = {}
+            
+            self.knowledge_base[category][key] = {
+                "value": value,
+                "updated_at": time.time()
+            }
         
-        self._save_knowledge_base()
+        self._schedule_kb_flush()
     
     def get_knowledge(self, category: str, key: Optional[str] = None) -> Optional[Any]:
         if category not in self.knowledge_base:
@@ -253,71 +496,188 @@ class LongTermMemory:
         return {k: v["value"] for k, v in self.knowledge_base[category].items()}
     
     def get_target_history(self, target: str) -> List[dict]:
-        return self.target_history.get(target, [])
+        with self._lock.rlock():
+            return self.target_history.get(target, [])
     
     def get_all_targets(self) -> List[str]:
-        return list(self.target_history.keys())
+        with self._lock.rlock():
+            return list(self.target_history.keys())
     
     def get_findings_by_severity(self, severity: str) -> List[MemoryEntry]:
-        return [
-            e for e in self.memories.values()
-            if e.entry_type == "finding" and 
-            e.metadata.get("severity", "").lower() == severity.lower()
-        ]
+        with self._lock.rlock():
+            ids = self._findings_by_severity.get(severity.lower(), ())
+            return [self.memories[entry_id] for entry_id in ids]
     
     def _save_entry(self, entry: MemoryEntry):
-        filepath = os.path.join(self.storage_path, f"{entry.entry_type}_{entry.id}.json")
-        with open(filepath, "w") as f:
-            json.dump(entry.to_dict(), f, indent=2)
+        line = _dumps(entry.to_dict()) + b"\n"
+        with self._write_lock:
+            self._log.write(line)
+            if self._flush_timer is None:
+                # Non-daemon, so a pending flush still runs at interpreter exit
+                self._flush_timer = threading.Timer(_LOG_FLUSH_DELAY, self.flush)
+                self._flush_timer.start()
+    
+    def flush(self):
+        with self._write_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._log is not None and not self._log.closed:
+                self._log.flush()
+    
+    def close(self):
+        self.flush()
+        self._flush_kb_now()
+        with self._write_lock:
+            if self._log is not None:
+                self._log.close()
+    
+    def compact(self):
+        """Rewrite the log with exactly one record per live entry."""
+        with self._write_lock:
+            # Snapshot under the writer lock: a store() landing after this
+            # point appends to the new log once it is reopened
+            with self._lock.rlock():
+                records = [entry.to_dict() for entry in self.memories.values()]
+            
+            # The new log is written in full before the live one is touched,
+            # so a failure here leaves the old log open and intact
+            tmp_path = self._log_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for record in records:
+                    f.write(_dumps(record) + b"\n")
+            
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._log is not None:
+                self._log.close()
+            try:
+                os.replace(tmp_path, self._log_path)
+            finally:
+                # Reopened even if the swap failed, so later stores still
+                # have a log to append to
+                self._log = open(self._log_path, "ab", buffering=1 << 16)
+    
+    def _schedule_kb_flush(self):
+        with self._kb_lock:
+            self._kb_dirty = True
+            if self._kb_flush_timer is None:
+                self._kb_flush_timer = threading.Timer(_LOG_FLUSH_DELAY, self._flush_kb_now)
+                self._kb_flush_timer.start()
+    
+    def _flush_kb_now(self):
+        # Must not be called with self._lock held
+        with self._kb_lock:
+            if self._kb_flush_timer is not None:
+                self._kb_flush_timer.cancel()
+                self._kb_flush_timer = None
+            if not self._kb_dirty:
+                return
+            try:
+                self._save_knowledge_base()
+            except Exception:
+                # Still dirty, so the next flush tries again
+                logger.exception("Failed to save knowledge base")
+                return
+            self._kb_dirty = False
     
     def _save_knowledge_base(self):
+        # Caller must hold self._kb_lock so an older snapshot never lands last
+        with self._lock.rlock():
+            data = _dumps(self.knowledge_base, indent=True)
+        
         filepath = os.path.join(self.storage_path, "knowledge_base.json")
-        with open(filepath, "w") as f:
-            json.dump(self.knowledge_base, f, indent=2)
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
     
     def _load_from_disk(self):
         kb_path = os.path.join(self.storage_path, "knowledge_base.json")
         if os.path.exists(kb_path):
             try:
-                with open(kb_path, "r") as f:
-                    self.knowledge_base = json.load(f)
+                with open(kb_path, "rb") as f:
+                    self.knowledge_base = _loads(f.read())
             except Exception:
                 pass
         
+        if not os.path.exists(self._log_path):
+            # The log is the only record of entries once it exists; the
+            # directory is scanned just once, to fold in the per-entry files
+            # written by older versions
+            if self._load_legacy_entries():
+                self.compact()
+            return
+        
+        records = 0
+        log_ids = set()
+        clean = True
+        with open(self._log_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            # Parse straight from the page cache instead of copying the file
+            # through a read buffer and a decoded str first
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b""):
+                    try:
+                        log_ids.add(self._load_entry(_loads(line)))
+                        records += 1
+                    except Exception:
+                        # A torn line from an interrupted write; rewriting the
+                        # log also keeps new appends from landing on it
+                        clean = False
+        
+        if not clean or records > len(log_ids):
+            self.compact()
+    
+    def _load_legacy_entries(self) -> int:
+        loaded = 0
         for filename in os.listdir(self.storage_path):
             if filename.endswith(".json") and filename != "knowledge_base.json":
                 filepath = os.path.join(self.storage_path, filename)
                 try:
-                    with open(filepath, "r") as f:
-                        data = json.load(f)
-                        entry = MemoryEntry(
-                            id=data["id"],
-                            content=data["content"],
-                            entry_type=data["entry_type"],
-                            source=data["source"],
-                            timestamp=data.get("timestamp", time.time()),
-                            importance=data.get("importance", 0.5),
-                            access_count=data.get("access_count", 0),
-                            last_accessed=data.get("last_accessed", time.time()),
-                            metadata=data.get("metadata", {})
-                        )
-                        self.memories[entry.id] = entry
+                    with open(filepath, "rb") as f:
+                        self._load_entry(_loads(f.read()))
+                    loaded += 1
                 except Exception:
                     pass
-    
-    def export_report(self, filepath: str, target: Optional[str] = None):
-        report = {
-            "generated_at": datetime.now().isoformat(),
-            "total_memories": len(self.memories),
-            "findings": []
-        }
-        
-        findings = [e for e in self.memories.values() if e.entry_type == "finding"]
+        return loaded
+    
+    def _load_entry(self, data: dict) -> str:
+        entry = MemoryEntry(
+            id=data["id"],
+            content=data["content"],
+            entry_type=data["entry_type"],
+            source=data["source"],
+            timestamp=data.get("timestamp", time.time()),
+            importance=data.get("importance", 0.5),
+            access_count=data.get("access_count", 0),
+            last_accessed=data.get("last_accessed", time.time()),
+            metadata=data.get("metadata", {})
+        )
+        self.memories[entry.id] = entry
+        self._index_entry(entry)
+        return entry.id
+    
+    def export_report(self, filepath: str, target: Optional[str] = None,
+                      max_findings: Optional[int] = None):
+        with self._lock.rlock():
+            report = {
+                "generated_at": datetime.now().isoformat(),
+                "total_memories": len(self.memories),
+                "findings": []
+            }
+            
+            findings = [e for e in self.memories.values() if e.entry_type == "finding"]
         
         if target:
             findings = [f for f in findings if f.metadata.get("target") == target]
         
-        findings.sort(key=lambda f: -f.importance)
+        if max_findings is not None:
+            findings = heapq.nsmallest(max_findings, findings, key=lambda f: -f.importance)
+        else:
+            findings.sort(key=lambda f: -f.importance)
         
         for finding in findings:
             report["findings"].append({
@@ -328,30 +688,40 @@ class LongTermMemory:
                 "timestamp": datetime.fromtimestamp(finding.timestamp).isoformat()
             })
         
-        with open(filepath, "w") as f:
-            json.dump(report, f, indent=2)
+        with open(filepath, "wb") as f:
+            f.write(_dumps(report, indent=True))
     
     def get_summary(self) -> dict:
-        findings = [e for e in self.memories.values() if e.entry_type == "finding"]
-        
-        severity_counts = {}
-        for f in findings:
-            sev = f.metadata.get("severity", "info")
-            severity_counts[sev] = severity_counts.get(sev, 0) + 1
-        
-        return {
-            "total_memories": len(self.memories),
-            "total_findings": len(findings),
-            "severity_distribution": severity_counts,
-            "knowledge_categories": list(self.knowledge_base.keys()),
-            "targets_analyzed": len(self.target_history)
-        }
+        with self._lock.rlock():
+            findings = [e for e in self.memories.values() if e.entry_type == "finding"]
+            
+            severity_counts = {}
+            for f in findings:
+                sev = f.metadata.get("severity", "info")
+                severity_counts[sev] = severity_counts.get(sev, 0) + 1
+            
+            return {
+                "total_memories": len(self.memories),
+                "total_findings": len(findings),
+                "severity_distribution": severity_counts,
+                "knowledge_categories": list(self.knowledge_base.keys()),
+                "targets_analyzed": len(self.target_history)
+            }
     
     def clear(self):
-        with self._lock:
+        # Pending knowledge writes land first, as they would have unbatched
+        self._flush_kb_now()
+        with self._lock.wlock():
             self.memories.clear()
             self.knowledge_base.clear()
             self.target_history.clear()
+            self._index.clear()
+            self._vocabulary.clear()
+            self._entry_order.clear()
+            self._findings_by_severity.clear()
+            self._version += 1
+            with self._access_lock:
+                self._retrieve_cache.clear()
 
 
 class MemorySystem:
@@ -372,6 +742,9 @@ class MemorySystem:
     def get_working_context(self, key: str) -> Optional[Any]:
         return self.short_term.get_context(key)
     
+    def get_raw_output(self, entry: MemoryEntry) -> str:
+        return self.long_term.get_raw_output(entry)
+    
     def store_knowledge(self, category: str, key: str, value: Any):
         self.long_term.store_knowledge(category, key, value)
     
@@ -382,22 +755,42 @@ class MemorySystem:
         return self.long_term.retrieve(query, limit=limit)
     
     def get_context_for_llm(self, max_tokens: int = 2000) -> str:
-        context_parts = []
+        if max_tokens < 0:
+            return "".join(self._context_fragments())[:max_tokens]
         
-        if self.short_term.current_focus:
-            context_parts.append(f"Current Focus: {self.short_term.current_focus}")
+        # Stop formatting as soon as the budget is used up
+        buf = []
+        remaining = max_tokens
+        for fragment in self._context_fragments():
+            if len(fragment) >= remaining:
+                buf.append(fragment[:remaining])
+                break
+            buf.append(fragment)
+            remaining -= len(fragment)
+        return "".join(buf)
+    
+    def _context_fragments(self):
+        # Yields the context text piece by piece; joined, the pieces form the
+        # sections separated by blank lines
+        short_term = self.short_term
+        sep = ""
         
-        working_ctx = self.short_term.working_context
-        if working_ctx:
-            ctx_items = [f"- {k}: {v['value']}" for k, v in working_ctx.items()]
-            context_parts.append("Working Context:\n" + "\n".join(ctx_items))
+        if short_term.current_focus:
+            yield _FOCUS_PREFIX + str(short_term.current_focus)
+            sep = _SECTION_SEP
         
-        findings = self.short_term.get_recent_findings()
-        if findings:
-            findings_text = "\n".join([f"- [{f['severity']}] {f['content']}" for f in findings[-5:]])
-            context_parts.append(f"Recent Findings:\n{findings_text}")
+        ctx_items = list(short_term.working_context.items())
+        if ctx_items:
+            yield sep + _WORKING_CONTEXT_HEADER
+            for i, (k, v) in enumerate(ctx_items):
+                yield ("\n" if i else "") + f"- {k}: {v}"
+            sep = _SECTION_SEP
         
-        return "\n\n".join(context_parts)[:max_tokens]
+        findings = short_term.get_recent_findings()[-5:]
+        if findings:
+            yield sep + _RECENT_FINDINGS_HEADER
+            for i, f in enumerate(findings):
+                yield ("\n" if i else "") + f"- [{f['severity']}] {f['content']}"
     
     def get_full_summary(self) -> dict:
         return {
@@ -408,5 +801,6 @@ class MemorySystem:
     def clear_short_term(self):
         self.short_term.clear()
     
-    def export_findings(self, filepath: str, target: Optional[str] = None):
-        self.long_term.export_report(filepath, target)
+    def export_findings(self, filepath: str, target: Optional[str] = None,
+                        max_findings: Optional[int] = None):
+        self.long_term.export_report(filepath, target, max_findings)
@@ -4,10 +4,19 @@ Orchestrator - Main coordinator for AI agent operations
 
 import os
 import time
+import asyncio
 import threading
-from typing import Dict, List, Optional, Callable
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Callable, Tuple
 from dataclasses import dataclass
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from .agent_manager import AgentManager, Agent
 from .queue_manager import QueueManager, QueueItem
 from .llm_client import LLMClient
@@ -24,6 +33,12 @@ class TargetConfig:
     aggressive: bool = False
 
 
+# Oldest findings are dropped past this; the memory system keeps the history
+_MAX_FINDINGS = 10000
+# Most commands an agent worker sends to the backend in one frame
+_MAX_DISPATCH_BATCH = 8
+
+
 @dataclass 
 class Finding:
     severity: str
@@ -42,19 +57,23 @@ class Orchestrator:
         self.ws_client = WebSocketClient()
         
         self.target_config: Optional[TargetConfig] = None
-        self.findings: List[Finding] = []
+        # deque.append is atomic, so result callbacks from any thread can
+        # append without taking self._lock
+        self.findings: Deque[Finding] = deque(maxlen=_MAX_FINDINGS)
         self.running = False
         self._lock = threading.Lock()
         self._worker_threads: List[threading.Thread] = []
         
-        self._callbacks: Dict[str, List[Callable]] = {
-            "started": [],
-            "stopped": [],
-            "finding": [],
-            "progress": [],
-            "error": [],
-            "completed": []
+        # Copy-on-write: on() rebinds a new tuple, readers never lock
+        self._callbacks: Dict[str, Tuple[Callable, ...]] = {
+            "started": (),
+            "stopped": (),
+            "finding": (),
+            "progress": (),
+            "error": (),
+            "completed": ()
         }
+        self._callbacks_lock = threading.Lock()
         
         self._setup_callbacks()
     
@@ -98,14 +117,37 @@ class Orchestrator:
         self.running = True
         self._notify("started", self.target_config)
         
-        self.ws_client.connect()
-        
-        response = self.llm_client.generate_plan(
-            self.target_config.target,
-            self.target_config.category,
-            self.target_config.mode,
-            self.target_config.instructions
+        # Connecting and planning are network round-trips; run them off the
+        # caller's (UI) thread
+        thread = threading.Thread(
+            target=asyncio.run,
+            args=(self._start_async(),),
+            daemon=True
         )
+        thread.start()
+    
+    async def _start_async(self):
+        config = self.target_config
+        # The websocket handshake and the plan request are independent, so
+        # they overlap instead of running back to back
+        try:
+            _, response = await asyncio.gather(
+                asyncio.to_thread(self.ws_client.connect),
+                asyncio.to_thread(
+                    self.llm_client.generate_plan,
+                    config.target,
+                    config.category,
+                    config.mode,
+                    config.instructions
+                )
+            )
+        except Exception as e:
+            # No caller is left to raise to
+            self._notify("error", str(e))
+            return
+        
+        if not self.running:
+            return
         
         commands = self.llm_client.parse_commands(response)
         if commands:
@@ -182,26 +224,37 @@ class Orchestrator:
         return "Unknown queue command"
     
     def _agent_worker(self, agent_id: int):
-        delay = 0.5 if self.target_config and self.target_config.stealth else 0.1
+        # Only stealth mode paces dispatch; otherwise the next command goes
+        # out as soon as one is available
+        delay = 0.5 if self.target_config and self.target_config.stealth else 0
+        # A batch runs back to back on the backend, so stealth pacing needs
+        # one command per send
+        batch_size = 1 if delay else _MAX_DISPATCH_BATCH
         
         while self.running:
-            item = self.queue_manager.get_next_pending()
-            if item:
-                self.agent_manager.update_agent_status(agent_id, "running", item.command)
-                self.ws_client.execute_command(agent_id, item.command)
+            workers = len(self.agent_manager.agents)
+            items = self.queue_manager.get_next_pending_batch(batch_size, workers)
+            if items:
+                self.agent_manager.update_agent_status(agent_id, "running", items[0].command)
+                if len(items) == 1:
+                    self.ws_client.execute_command(agent_id, items[0].command)
+                else:
+                    self.ws_client.execute_commands(agent_id, [item.command for item in items])
                 
-                time.sleep(delay)
+                if delay:
+                    time.sleep(delay)
             else:
                 if self.queue_manager.get_pending_count() == 0 and self.queue_manager.get_running_count() == 0:
                     self._request_more_commands()
-                time.sleep(1)
+                self.queue_manager.wait_for_work(timeout=1.0)
     
     def _request_more_commands(self):
         with self._lock:
             if not self.running:
                 return
             
-            findings_text = [f.description for f in self.findings[-10:]]
+            recent = list(islice(reversed(self.findings), 10))
+            findings_text = [f.description for f in reversed(recent)]
             response = self.llm_client.continue_execution(
                 findings_text,
                 self.target_config.instructions if self.target_config else ""
@@ -255,7 +308,7 @@ class Orchestrator:
         pass
     
     def get_findings(self) -> List[Finding]:
-        return self.findings
+        return list(self.findings)
     
     def get_status(self) -> dict:
         return {
@@ -267,26 +320,33 @@ class Orchestrator:
         }
     
     def on(self, event: str, callback: Callable):
-        if event in self._callbacks:
-            self._callbacks[event].append(callback)
+        with self._callbacks_lock:
+            if event in self._callbacks:
+                self._callbacks[event] = self._callbacks[event] + (callback,)
     
     def _notify(self, event: str, data):
-        for callback in self._callbacks.get(event, []):
+        for callback in self._callbacks.get(event, ()):
             try:
                 callback(data)
             except Exception as e:
                 print(f"Orchestrator callback error: {e}")
     
     def export_findings(self, filepath: str):
-        import json
-        with open(filepath, "w") as f:
-            json.dump([{
-                "severity": f.severity,
-                "title": f.title,
-                "description": f.description,
-                "agent_id": f.agent_id,
-                "timestamp": f.timestamp
-            } for f in self.findings], f, indent=2)
+        records = [{
+            "severity": f.severity,
+            "title": f.title,
+            "description": f.description,
+            "agent_id": f.agent_id,
+            "timestamp": f.timestamp
+        } for f in list(self.findings)]
+        
+        if ORJSON_AVAILABLE:
+            with open(filepath, "wb") as f:
+                f.write(orjson.dumps(records, option=orjson.OPT_INDENT_2))
+        else:
+            import json
+            with open(filepath, "w") as f:
+                json.dump(records, f, indent=2)
     
     def save_log(self, filepath: str, content: str):
         with open(filepath, "a") as f:
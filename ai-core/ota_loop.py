@@ -2,16 +2,58 @@
 Observe-Think-Act Loop - Core autonomous decision-making cycle
 """
 
+import re
 import time
-import threading
+import asyncio
 import json
+import itertools
+import threading
+import logging
+from functools import lru_cache
+from collections import Counter, OrderedDict, deque
+from queue import Empty, SimpleQueue
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Callable, Any
+from typing import Awaitable, Deque, Dict, List, Optional, Callable, Any, Tuple
 from .goal_system import GoalSystem, Goal, GoalStatus
 from .planner import Planner, SubTask, TaskStatus
 from .memory_system import MemorySystem
 
+logger = logging.getLogger(__name__)
+
+
+# Only the most recent history is kept; long autonomous runs would otherwise
+# grow these without bound
+_HISTORY_LIMIT = 1000
+# Most queued events the callback thread delivers per wakeup
+_EVENT_BATCH = 64
+# Finding text kept in an observation; _think only looks at the start
+_FINDING_PREVIEW = 200
+# Actions executing at once; the loop keeps ticking while they run
+_MAX_INFLIGHT_ACTIONS = 4
+# How long an exiting loop waits for in-flight actions before its event
+# loop tears down and cancels them
+_INFLIGHT_DRAIN_TIMEOUT = 3.0
+# A failing callback is logged this many times, then silenced
+_CALLBACK_ERROR_REPEATS = 5
+# Distinct callback errors remembered before the counts start over
+_CALLBACK_ERROR_KEYS = 100
+# Idle ticks stretch loop_delay by this factor each time, up to the cap
+_IDLE_BACKOFF = 1.5
+_MAX_IDLE_DELAY = 30.0
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _slim_task(task: SubTask) -> Dict:
+    # Just what _think reads; the command stays whole since it gets executed
+    return {"id": task.id, "name": task.name, "command": task.command}
+
 
 class AutonomyLevel(Enum):
     MANUAL = 0
@@ -27,7 +69,7 @@ class SafetyMode(Enum):
     PERMISSIVE = "permissive"
 
 
-@dataclass
+@dataclass(slots=True)
 class Observation:
     timestamp: float
     observation_type: str
@@ -43,7 +85,7 @@ class Observation:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Thought:
     timestamp: float
     reasoning: str
@@ -61,7 +103,7 @@ class Thought:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Action:
     id: str
     action_type: str
@@ -86,19 +128,19 @@ class Action:
 
 
 class OTALoop:
-    DANGEROUS_COMMANDS = [
+    DANGEROUS_COMMANDS = (
         "rm -rf", "mkfs", "dd if=", "> /dev/", 
         "chmod -R 777", ":(){:|:&};:", "wget | sh",
         "curl | bash", "shutdown", "reboot", "halt"
-    ]
+    )
     
-    ALLOWED_TOOLS = [
+    ALLOWED_TOOLS = frozenset({
         "nmap", "nikto", "gobuster", "dirb", "ffuf",
         "whatweb", "whois", "dig", "nslookup", "curl",
         "wget", "subfinder", "amass", "nuclei", "httpx",
         "masscan", "rustscan", "wpscan", "sqlmap", "hydra",
         "ls", "cat", "head", "tail", "grep", "find", "file"
-    ]
+    })
     
     def __init__(
         self,
@@ -123,24 +165,60 @@ class OTALoop:
         self.max_loops = 100
         self.loop_delay = 1.0
         
-        self.observations: List[Observation] = []
-        self.thoughts: List[Thought] = []
-        self.actions: List[Action] = []
-        self.pending_approvals: List[Action] = []
+        self.observations: Deque[Observation] = deque(maxlen=_HISTORY_LIMIT)
+        self.thoughts: Deque[Thought] = deque(maxlen=_HISTORY_LIMIT)
+        self.actions: Deque[Action] = deque(maxlen=_HISTORY_LIMIT)
+        # action id -> action, oldest first
+        self.pending_approvals: "OrderedDict[str, Action]" = OrderedDict()
         
-        self._lock = threading.Lock()
+        # Everything runs on one event loop, so plain attribute updates need
+        # no lock; blocking executor/LLM calls are pushed to worker threads
+        self._loop_task: Optional[asyncio.Task] = None
+        # Only set when start() runs the loop on its own thread
         self._loop_thread: Optional[threading.Thread] = None
-        self._next_action_id = 1
-        
-        self._callbacks: Dict[str, List[Callable]] = {
-            "observation": [],
-            "thought": [],
-            "action_proposed": [],
-            "action_executed": [],
-            "approval_required": [],
-            "loop_iteration": [],
-            "error": []
+        # Cleared while paused; the loop blocks on it instead of polling
+        self._resume_event = asyncio.Event()
+        self._resume_event.set()
+        # Set by stop() so an in-progress delay ends immediately
+        self._stop_event = asyncio.Event()
+        # Ends the current delay early when there is something new to look at
+        self._wake_event = asyncio.Event()
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Consecutive iterations that observed nothing
+        self._idle_ticks = 0
+        # next() on a count is atomic, so ids stay unique even if actions are
+        # prepared from outside the loop's thread
+        self._action_ids = itertools.count(1)
+        # _think's result for the last distinct input, reused while the
+        # observation says the same thing
+        self._last_think_key: Optional[tuple] = None
+        self._last_thought: Optional[Thought] = None
+        self._last_memory_context: Optional[dict] = None
+        # Running action tasks; holding them here also keeps them alive
+        self._inflight: Dict[asyncio.Task, Action] = {}
+        # action_type -> coroutine that carries it out
+        self._action_handlers: Dict[str, Callable[[Action], Awaitable[Dict]]] = {
+            "execute_task": self._handle_execute_task,
+            "request_more_tasks": self._handle_request_more_tasks
+        }
+        
+        # Copy-on-write: on() rebinds a new tuple, readers never lock
+        self._callbacks: Dict[str, Tuple[Callable, ...]] = {
+            "observation": (),
+            "thought": (),
+            "action_proposed": (),
+            "action_executed": (),
+            "approval_required": (),
+            "loop_iteration": (),
+            "error": ()
         }
+        self._callbacks_lock = threading.Lock()
+        # Callbacks run on their own thread so a slow subscriber never
+        # stalls the loop; started on the first on()
+        self._event_q: SimpleQueue = SimpleQueue()
+        self._event_thread: Optional[threading.Thread] = None
+        # Only touched by the callback thread
+        self._error_counts: Counter = Counter()
     
     def set_autonomy_level(self, level: AutonomyLevel):
         self.autonomy_level = level
@@ -149,63 +227,206 @@ class OTALoop:
         self.safety_mode = mode
     
     def start(self):
+        """Run the loop on a background thread with its own event loop.
+        Inside a running event loop, await start_async() instead."""
+        if self.running:
+            return
+        
+        started = threading.Event()
+        
+        async def run():
+            await self.start_async()
+            started.set()
+            await self._loop_task
+        
+        self._loop_thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+        self._loop_thread.start()
+        started.wait(timeout=5)
+    
+    async def start_async(self):
+        """Run the loop as a task on the current event loop."""
         if self.running:
             return
         
         self.running = True
         self.paused = False
         self.loop_count = 0
-        
-        self._loop_thread = threading.Thread(target=self._main_loop, daemon=True)
-        self._loop_thread.start()
+        self._idle_ticks = 0
+        self._event_loop = asyncio.get_running_loop()
+        # asyncio events bind to the loop that first waits on them, so a
+        # restart on another loop needs fresh ones
+        self._resume_event = asyncio.Event()
+        self._resume_event.set()
+        self._stop_event = asyncio.Event()
+        self._wake_event = asyncio.Event()
+        
+        self._loop_task = asyncio.create_task(self._main_loop())
     
     def stop(self):
-        self.running = False
-        if self._loop_thread:
+        loop = self._event_loop
+        if loop is not None and loop.is_running() and loop is not _running_loop():
+            future = asyncio.run_coroutine_threadsafe(self.stop_async(), loop)
+            try:
+                future.result(timeout=6)
+            except Exception:
+                pass
+        else:
+            # Called from the loop's own thread (which must not block) or
+            # with no loop running; just signal
+            self._request_stop()
+        
+        if self._loop_thread and self._loop_thread is not threading.current_thread():
             self._loop_thread.join(timeout=5)
     
+    async def stop_async(self):
+        self._request_stop()
+        if self._loop_task:
+            await asyncio.wait({self._loop_task}, timeout=5)
+    
+    def _request_stop(self):
+        # Must run on the loop's thread, or with no loop running
+        self.running = False
+        self._stop_event.set()
+        self._wake_event.set()
+        # Wake a paused loop so it can see running is False and exit
+        self._resume_event.set()
+    
     def pause(self):
         self.paused = True
+        self._resume_event.clear()
     
     def resume(self):
         self.paused = False
+        self._set_threadsafe(self._resume_event)
+    
+    def _wake(self):
+        self._set_threadsafe(self._wake_event)
+    
+    def _set_threadsafe(self, event: asyncio.Event):
+        # Callers may be on other threads (inject_observation, a UI calling
+        # resume), so the event is set on its own loop
+        loop = self._event_loop
+        if loop is None or loop is _running_loop():
+            event.set()
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # Loop already closed; nothing is waiting on the event
+            event.set()
+    
+    def _idle_delay(self) -> float:
+        if not self._idle_ticks:
+            return self.loop_delay
+        return min(_MAX_IDLE_DELAY, self.loop_delay * _IDLE_BACKOFF ** self._idle_ticks)
     
-    def _main_loop(self):
+    async def _wait_stopped(self, timeout: float) -> bool:
+        """Sleep up to timeout or until woken; True if stop() was called."""
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake_event.clear()
+        return self._stop_event.is_set()
+    
+    async def _main_loop(self):
+        try:
+            await self._run_loop()
+        finally:
+            await self._drain_inflight()
+    
+    async def _run_loop(self):
         while self.running and self.loop_count < self.max_loops:
             if self.paused:
-                time.sleep(0.5)
+                await self._resume_event.wait()
                 continue
             
             try:
                 self.loop_count += 1
                 self._notify("loop_iteration", {"count": self.loop_count})
                 
-                observation = self._observe()
-                if observation:
-                    self.observations.append(observation)
-                    self._notify("observation", observation)
-                
-                thought = self._think(observation)
-                if thought:
-                    self.thoughts.append(thought)
-                    self._notify("thought", thought)
-                
-                for proposed_action in thought.proposed_actions if thought else []:
-                    action = self._prepare_action(proposed_action)
-                    if action:
-                        self._act(action)
+                fast_task = self._fast_path_task()
+                if fast_task is not None:
+                    self._fast_dispatch_pending_task(fast_task)
+                    observation = thought = None
+                else:
+                    observation = await self._observe()
+                    if observation:
+                        self.observations.append(observation)
+                        self._notify("observation", observation)
+                    
+                    thought = await self._think(observation)
+                    if thought:
+                        self.thoughts.append(thought)
+                        self._notify("thought", thought)
+                    
+                    for proposed_action in thought.proposed_actions if thought else []:
+                        if not self._can_dispatch(proposed_action):
+                            continue
+                        action = await self._prepare_action(proposed_action)
+                        if action:
+                            self._dispatch(action)
                 
                 if self._check_completion():
                     self.running = False
                     break
                 
-                time.sleep(self.loop_delay)
+                if fast_task is not None or observation or thought:
+                    self._idle_ticks = 0
+                else:
+                    self._idle_ticks += 1
+                
+                if await self._wait_stopped(self._idle_delay()):
+                    break
                 
             except Exception as e:
                 self._notify("error", {"error": str(e), "loop": self.loop_count})
-                time.sleep(2)
+                if await self._wait_stopped(2):
+                    break
+    
+    async def _drain_inflight(self):
+        # Whoever owns the event loop (asyncio.run in start()) cancels what is
+        # still pending once we return, so give running actions a chance to
+        # finish and report back to the planner first
+        if self._inflight:
+            await asyncio.wait(set(self._inflight), timeout=_INFLIGHT_DRAIN_TIMEOUT)
     
-    def _observe(self) -> Optional[Observation]:
+    def _fast_path_task(self) -> Optional[SubTask]:
+        """The next pending task when _think would only propose running it
+        and no approval would be asked for, else None."""
+        if self.autonomy_level.value < AutonomyLevel.SEMI_AUTONOMOUS.value:
+            return None
+        if self.safety_mode is SafetyMode.STRICT or len(self._inflight) >= _MAX_INFLIGHT_ACTIONS:
+            return None
+        
+        task = self.planner.first_pending()
+        if task is None:
+            return None
+        if (self.autonomy_level is not AutonomyLevel.FULL_AUTONOMOUS
+                and self._is_dangerous_command(task.command)):
+            return None
+        
+        if any(g.progress < 50 for g in self.goal_system.get_active_goals()):
+            return None
+        for finding in self.memory.short_term.get_recent_findings()[-3:]:
+            if finding.get("severity") in ("critical", "high"):
+                return None
+        
+        return task
+    
+    def _fast_dispatch_pending_task(self, task: SubTask):
+        # Same action the full observe/think/prepare path would build
+        action = Action(
+            id=f"action_{next(self._action_ids)}",
+            action_type="execute_task",
+            parameters={"type": "execute_task", "task_id": task.id, "command": task.command},
+            requires_approval=False,
+            approved=True
+        )
+        self.actions.append(action)
+        self._dispatch(action)
+    
+    async def _observe(self) -> Optional[Observation]:
         observations_data = {}
         
         active_goals = self.goal_system.get_active_goals()
@@ -215,24 +436,30 @@ class OTALoop:
                 for g in active_goals
             ]
         
-        pending_tasks = [t for t in self.planner.tasks.values() if t.status == TaskStatus.PENDING]
-        running_tasks = [t for t in self.planner.tasks.values() if t.status == TaskStatus.RUNNING]
+        planner = self.planner
+        next_task = planner.first_pending()
         
         observations_data["tasks"] = {
-            "pending": len(pending_tasks),
-            "running": len(running_tasks),
-            "next_task": pending_tasks[0].to_dict() if pending_tasks else None
+            "pending": planner.count_by_status(TaskStatus.PENDING),
+            "running": planner.count_by_status(TaskStatus.RUNNING),
+            "next_task": _slim_task(next_task) if next_task else None
         }
         
-        observations_data["memory_context"] = self.memory.short_term.get_summary()
+        # Only recorded when it differs from the previous observation's
+        memory_context = self.memory.short_term.get_summary()
+        if memory_context != self._last_memory_context:
+            observations_data["memory_context"] = memory_context
         
         recent_findings = self.memory.short_term.get_recent_findings()
         if recent_findings:
-            observations_data["recent_findings"] = recent_findings[-3:]
+            observations_data["recent_findings"] = [
+                {**f, "content": f["content"][:_FINDING_PREVIEW]} for f in recent_findings[-3:]
+            ]
         
         if not observations_data.get("active_goals") and not observations_data.get("tasks", {}).get("pending"):
             return None
         
+        self._last_memory_context = memory_context
         return Observation(
             timestamp=time.time(),
             observation_type="state_update",
@@ -240,18 +467,42 @@ class OTALoop:
             source="ota_loop"
         )
     
-    def _think(self, observation: Optional[Observation]) -> Optional[Thought]:
+    async def _think(self, observation: Optional[Observation]) -> Optional[Thought]:
         if not observation:
             return None
         
+        tasks_data = observation.data.get("tasks", {})
+        next_task = tasks_data.get("next_task")
+        active_goals = observation.data.get("active_goals", [])
+        recent_findings = observation.data.get("recent_findings", [])
+        
+        # Everything the reasoning below depends on
+        key = (
+            (next_task.get("id"), next_task.get("name", "Unknown"), next_task.get("command", ""))
+            if next_task else None,
+            tuple(g.get("name") for g in active_goals if g.get("progress", 0) < 50),
+            tuple(f.get("content", "")[:50] for f in recent_findings
+                  if f.get("severity") in ("critical", "high")),
+            bool(tasks_data.get("pending")),
+            bool(self.llm_client)
+        )
+        if key == self._last_think_key:
+            cached = self._last_thought
+            if cached is None:
+                return None
+            return Thought(
+                timestamp=time.time(),
+                reasoning=cached.reasoning,
+                conclusions=list(cached.conclusions),
+                proposed_actions=[dict(a) for a in cached.proposed_actions],
+                confidence=cached.confidence
+            )
+        
         reasoning_parts = []
         conclusions = []
         proposed_actions = []
         confidence = 0.8
         
-        tasks_data = observation.data.get("tasks", {})
-        next_task = tasks_data.get("next_task")
-        
         if next_task:
             reasoning_parts.append(f"Found pending task: {next_task.get('name', 'Unknown')}")
             conclusions.append("Should execute the next pending task")
@@ -262,17 +513,16 @@ class OTALoop:
                 "command": next_task.get("command", "")
             })
         
-        active_goals = observation.data.get("active_goals", [])
         for goal_data in active_goals:
             if goal_data.get("progress", 0) < 50:
                 reasoning_parts.append(f"Goal '{goal_data.get('name')}' needs more progress")
         
-        recent_findings = observation.data.get("recent_findings", [])
         for finding in recent_findings:
             if finding.get("severity") in ["critical", "high"]:
                 reasoning_parts.append(f"High-severity finding detected: {finding.get('content', '')[:50]}")
                 conclusions.append("May need to prioritize based on critical findings")
         
+        cacheable = True
         if not proposed_actions:
             if not tasks_data.get("pending") and self.llm_client:
                 reasoning_parts.append("No pending tasks, may need to generate more")
@@ -280,22 +530,25 @@ class OTALoop:
                     "type": "request_more_tasks",
                     "context": self.memory.get_context_for_llm()
                 })
-        
-        if not reasoning_parts:
-            return None
-        
-        return Thought(
-            timestamp=time.time(),
-            reasoning=" | ".join(reasoning_parts),
-            conclusions=conclusions,
-            proposed_actions=proposed_actions,
-            confidence=confidence
-        )
+                # The memory context can change without the key changing
+                cacheable = False
+        
+        thought = None
+        if reasoning_parts:
+            thought = Thought(
+                timestamp=time.time(),
+                reasoning=" | ".join(reasoning_parts),
+                conclusions=conclusions,
+                proposed_actions=proposed_actions,
+                confidence=confidence
+            )
+        
+        self._last_think_key = key if cacheable else None
+        self._last_thought = thought
+        return thought
     
-    def _prepare_action(self, proposed: Dict) -> Optional[Action]:
-        with self._lock:
-            action_id = f"action_{self._next_action_id}"
-            self._next_action_id += 1
+    async def _prepare_action(self, proposed: Dict) -> Optional[Action]:
+        action_id = f"action_{next(self._action_ids)}"
         
         action_type = proposed.get("type", "unknown")
         requires_approval = self._check_requires_approval(proposed)
@@ -311,58 +564,78 @@ class OTALoop:
         self.actions.append(action)
         
         if requires_approval:
-            self.pending_approvals.append(action)
+            pending = self.pending_approvals
+            pending[action.id] = action
+            if len(pending) > _HISTORY_LIMIT:
+                pending.popitem(last=False)
             self._notify("approval_required", action)
             return None
         
         return action
     
     def _check_requires_approval(self, proposed: Dict) -> bool:
-        if self.autonomy_level == AutonomyLevel.MANUAL:
-            return True
-        
-        if self.autonomy_level == AutonomyLevel.FULL_AUTONOMOUS:
+        level = self.autonomy_level
+        if level is AutonomyLevel.FULL_AUTONOMOUS:
             return False
-        
-        command = proposed.get("command", "")
-        
-        if self.safety_mode == SafetyMode.STRICT:
+        if level is AutonomyLevel.MANUAL or self.safety_mode is SafetyMode.STRICT:
             return True
         
-        if self._is_dangerous_command(command):
+        if level is AutonomyLevel.SUPERVISED and proposed.get("type", "") in ("execute_task", "execute_command"):
             return True
         
-        if self.autonomy_level == AutonomyLevel.SUPERVISED:
-            action_type = proposed.get("type", "")
-            if action_type in ["execute_task", "execute_command"]:
-                return True
-        
-        return False
+        return self._is_dangerous_command(proposed.get("command", ""))
     
     def _is_dangerous_command(self, command: str) -> bool:
-        command_lower = command.lower()
-        
-        for dangerous in self.DANGEROUS_COMMANDS:
-            if dangerous in command_lower:
-                return True
-        
-        return False
+        return _is_dangerous(command)
     
     def _is_allowed_tool(self, command: str) -> bool:
-        if command.startswith("RUN "):
-            command = command[4:]
-        
-        tool = command.split()[0] if command else ""
-        return tool in self.ALLOWED_TOOLS
+        return _tool_name(command) in self.ALLOWED_TOOLS
+    
+    def _can_dispatch(self, proposed: Dict) -> bool:
+        if len(self._inflight) >= _MAX_INFLIGHT_ACTIONS:
+            return False
+        if proposed.get("type") == "request_more_tasks":
+            # One outstanding request for more work is enough
+            return all(a.action_type != "request_more_tasks" for a in self._inflight.values())
+        return True
+    
+    def _dispatch(self, action: Action):
+        task_id = None
+        if action.action_type == "execute_task" and self.executor:
+            task_id = action.parameters.get("task_id")
+        if task_id:
+            # Marked running up front so the next tick moves on to other work;
+            # without an executor nothing would ever complete it
+            self.planner.start_task(task_id, 1)
+        
+        task = asyncio.create_task(self._run_dispatched(action, task_id))
+        self._inflight[task] = action
+        task.add_done_callback(self._action_done)
+    
+    def _action_done(self, task: asyncio.Task):
+        self._inflight.pop(task, None)
+        # A finished action changes what the next observation sees
+        self._wake_event.set()
+    
+    async def _run_dispatched(self, action: Action, task_id: Optional[str]):
+        try:
+            await self._act(action)
+        finally:
+            # Also reached when the action is cancelled mid-flight; either way
+            # hand the task back to the planner's retry accounting rather
+            # than leaving it marked running
+            if task_id and (not action.executed
+                            or (action.result or {}).get("status") == "no_executor"):
+                self.planner.complete_task(task_id, "", False)
     
-    def _act(self, action: Action):
+    async def _act(self, action: Action):
         if not action.approved:
             return
         
         self._notify("action_proposed", action)
         
         try:
-            result = self._execute_action(action)
+            result = await self._execute_action(action)
             action.result = result
             action.executed = True
             self._notify("action_executed", action)
@@ -372,47 +645,50 @@ class OTALoop:
             action.executed = False
             self._notify("error", {"action": action.id, "error": str(e)})
     
-    def _execute_action(self, action: Action) -> Dict:
-        action_type = action.action_type
+    async def _execute_action(self, action: Action) -> Dict:
+        handler = self._action_handlers.get(action.action_type, self._handle_unknown_action)
+        return await handler(action)
+    
+    async def _handle_execute_task(self, action: Action) -> Dict:
         params = action.parameters
+        task_id = params.get("task_id")
+        command = params.get("command", "")
         
-        if action_type == "execute_task":
-            task_id = params.get("task_id")
-            command = params.get("command", "")
+        if self.executor:
+            result = await asyncio.to_thread(self.executor.execute_command, 1, command)
             
-            if self.executor:
-                result = self.executor.execute_command(1, command)
-                
-                if task_id:
-                    success = result.get("exit_code", 1) == 0
-                    self.planner.complete_task(task_id, result.get("output", ""), success)
-                
-                return result
+            if task_id:
+                success = result.get("exit_code", 1) == 0
+                self.planner.complete_task(task_id, result.get("output", ""), success)
             
-            return {"status": "no_executor", "command": command}
+            return result
         
-        elif action_type == "request_more_tasks":
-            if self.llm_client:
-                context = params.get("context", "")
-                active_goals = self.goal_system.get_active_goals()
-                
-                if active_goals:
-                    goal = active_goals[0]
-                    response = self.llm_client.continue_execution(
-                        [f.content for f in self.memory.short_term.recent_findings],
-                        goal.description
-                    )
-                    
-                    commands = self.llm_client.parse_commands(response)
-                    if commands:
-                        tasks = self.planner.add_tasks_from_llm(goal.id, commands)
-                        return {"status": "tasks_added", "count": len(tasks)}
-                    
-                    if self.llm_client.check_end_signal(response):
-                        return {"status": "completed", "signal": "END"}
+        return {"status": "no_executor", "command": command}
+    
+    async def _handle_request_more_tasks(self, action: Action) -> Dict:
+        if self.llm_client:
+            context = action.parameters.get("context", "")
+            active_goals = self.goal_system.get_active_goals()
             
-            return {"status": "no_llm_client"}
+            if active_goals:
+                goal = active_goals[0]
+                response = await asyncio.to_thread(
+                    self.llm_client.continue_execution,
+                    [f.content for f in self.memory.short_term.recent_findings],
+                    goal.description
+                )
+                
+                commands = self.llm_client.parse_commands(response)
+                if commands:
+                    tasks = self.planner.add_tasks_from_llm(goal.id, commands)
+                    return {"status": "tasks_added", "count": len(tasks)}
+                
+                if self.llm_client.check_end_signal(response):
+                    return {"status": "completed", "signal": "END"}
         
+        return {"status": "no_llm_client"}
+    
+    async def _handle_unknown_action(self, action: Action) -> Dict:
         return {"status": "unknown_action_type"}
     
     def _check_completion(self) -> bool:
@@ -422,33 +698,53 @@ class OTALoop:
             if self.goal_system.evaluate_goal(goal.id):
                 self.goal_system.complete_goal(goal.id, True)
         
-        pending_tasks = [t for t in self.planner.tasks.values() if t.status == TaskStatus.PENDING]
-        running_tasks = [t for t in self.planner.tasks.values() if t.status == TaskStatus.RUNNING]
-        
-        if not active_goals and not pending_tasks and not running_tasks:
+        planner = self.planner
+        if (not active_goals
+                and not planner.count_by_status(TaskStatus.PENDING)
+                and not planner.count_by_status(TaskStatus.RUNNING)):
             return True
         
         return False
     
     def approve_action(self, action_id: str) -> bool:
-        for action in self.pending_approvals:
-            if action.id == action_id:
-                action.approved = True
-                self.pending_approvals.remove(action)
-                self._act(action)
-                return True
-        return False
+        """Approve and run a pending action. Blocks until it has run unless
+        called from the loop's own thread, where it is scheduled instead."""
+        action = self.pending_approvals.pop(action_id, None)
+        if action is None:
+            return False
+        action.approved = True
+        self._wake()
+        
+        loop = self._event_loop
+        current = _running_loop()
+        if loop is not None and loop.is_running() and loop is not current:
+            asyncio.run_coroutine_threadsafe(self._act(action), loop).result()
+        elif current is not None:
+            task = current.create_task(self._act(action))
+            self._inflight[task] = action
+            task.add_done_callback(self._action_done)
+        else:
+            asyncio.run(self._act(action))
+        return True
+    
+    async def approve_action_async(self, action_id: str) -> bool:
+        action = self.pending_approvals.pop(action_id, None)
+        if action is None:
+            return False
+        action.approved = True
+        self._wake_event.set()
+        await self._act(action)
+        return True
     
     def reject_action(self, action_id: str) -> bool:
-        for action in self.pending_approvals:
-            if action.id == action_id:
-                action.approved = False
-                self.pending_approvals.remove(action)
-                return True
-        return False
+        action = self.pending_approvals.pop(action_id, None)
+        if action is None:
+            return False
+        action.approved = False
+        return True
     
     def get_pending_approvals(self) -> List[Action]:
-        return self.pending_approvals.copy()
+        return list(self.pending_approvals.values())
     
     def inject_observation(self, observation_type: str, data: Dict, source: str = "external"):
         observation = Observation(
@@ -459,6 +755,7 @@ class OTALoop:
         )
         self.observations.append(observation)
         self._notify("observation", observation)
+        self._wake()
     
     def get_state(self) -> dict:
         return {
@@ -474,12 +771,73 @@ class OTALoop:
         }
     
     def on(self, event: str, callback: Callable):
-        if event in self._callbacks:
-            self._callbacks[event].append(callback)
+        with self._callbacks_lock:
+            if event in self._callbacks:
+                self._callbacks[event] = self._callbacks[event] + (callback,)
+                if self._event_thread is None:
+                    self._event_thread = threading.Thread(target=self._event_pump, daemon=True)
+                    self._event_thread.start()
     
     def _notify(self, event: str, data):
-        for callback in self._callbacks.get(event, []):
+        callbacks = self._callbacks.get(event)
+        if callbacks:
+            self._event_q.put((event, callbacks, data))
+    
+    def _event_pump(self):
+        while True:
+            batch = [self._event_q.get()]
             try:
-                callback(data)
-            except Exception as e:
-                print(f"OTA callback error: {e}")
+                while len(batch) < _EVENT_BATCH:
+                    batch.append(self._event_q.get_nowait())
+            except Empty:
+                pass
+            
+            # Only the newest loop_iteration in a batch is worth delivering
+            last_iteration = None
+            for i, (event, _, _) in enumerate(batch):
+                if event == "loop_iteration":
+                    last_iteration = i
+            
+            for i, (event, callbacks, data) in enumerate(batch):
+                if event == "loop_iteration" and i != last_iteration:
+                    continue
+                for callback in callbacks:
+                    try:
+                        callback(data)
+                    except Exception as e:
+                        self._log_callback_error(event, e)
+    
+    def _log_callback_error(self, event: str, error: Exception):
+        key = f"{event}:{type(error).__name__}:{error}"
+        counts = self._error_counts
+        if key not in counts and len(counts) >= _CALLBACK_ERROR_KEYS:
+            counts.clear()
+        counts[key] += 1
+        n = counts[key]
+        if n < _CALLBACK_ERROR_REPEATS:
+            logger.warning("OTA callback error on %s", event, exc_info=error)
+        elif n == _CALLBACK_ERROR_REPEATS:
+            logger.warning("OTA callback error on %s (repeated, suppressing further reports)",
+                           event, exc_info=error)
+
+
+# All dangerous substrings in one case-insensitive alternation, so a command
+# is scanned once instead of once per pattern
+_DANGER_RE = re.compile(
+    "|".join(re.escape(p) for p in OTALoop.DANGEROUS_COMMANDS),
+    re.IGNORECASE
+)
+
+
+# The loop re-checks the same proposed commands tick after tick, so repeat
+# decisions are served from a bounded cache
+@lru_cache(maxsize=1024)
+def _is_dangerous(command: str) -> bool:
+    return _DANGER_RE.search(command) is not None
+
+
+@lru_cache(maxsize=1024)
+def _tool_name(command: str) -> str:
+    if command.startswith("RUN "):
+        command = command[4:]
+    return command.split(None, 1)[0] if command else ""
@@ -2,15 +2,23 @@
 Planner - Decomposes goals into executable sub-tasks and manages execution order
 """
 
+import re
 import json
 import time
+import heapq
+import itertools
 import threading
+from collections import defaultdict
 from enum import Enum
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Callable, Tuple
 from .goal_system import Goal, GoalType, GoalPriority, GoalStatus, SuccessCriteria
 
 
+_IP_RE = re.compile(r'^(\d{1,3}\.){3}\d{1,3}(/\d{1,2})?$')
+_DOMAIN_RE = re.compile(r'^[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z]{2,})+$')
+
+
 class TaskType(Enum):
     RECON = "reconnaissance"
     SCAN = "scan"
@@ -30,7 +38,23 @@ class TaskStatus(Enum):
     SKIPPED = "skipped"
 
 
-@dataclass
+_TOOL_TASK_TYPES: Dict[str, TaskType] = {
+    **dict.fromkeys(("whois", "dig", "nslookup", "curl", "whatweb"), TaskType.RECON),
+    **dict.fromkeys(("nmap", "masscan", "rustscan"), TaskType.SCAN),
+    **dict.fromkeys(("gobuster", "dirb", "ffuf", "subfinder", "amass"), TaskType.ENUMERATE),
+    **dict.fromkeys(("nikto", "nuclei", "wpscan"), TaskType.ANALYZE),
+}
+
+# Plan phase per task type; anything else runs in the last phase
+_TASK_TYPE_PHASES: Dict[TaskType, int] = {
+    TaskType.RECON: 0,
+    TaskType.SCAN: 1,
+    TaskType.ENUMERATE: 2,
+}
+_LAST_PHASE = 3
+
+
+@dataclass(slots=True)
 class SubTask:
     id: str
     name: str
@@ -51,30 +75,45 @@ class SubTask:
     completed_at: Optional[float] = None
     retry_count: int = 0
     max_retries: int = 3
+    # to_dict() output for the fields fixed at creation, built on first use
+    _static_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     
     def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "task_type": self.task_type.value,
-            "command": self.command,
-            "goal_id": self.goal_id,
-            "status": self.status.value,
-            "priority": self.priority,
-            "dependencies": self.dependencies,
-            "estimated_duration": self.estimated_duration,
-            "actual_duration": self.actual_duration,
-            "output": self.output[:500] if self.output else "",
-            "agent_id": self.agent_id,
-            "created_at": self.created_at,
-            "started_at": self.started_at,
-            "completed_at": self.completed_at,
-            "retry_count": self.retry_count
-        }
+        static = self._static_dict
+        if static is None:
+            static = self._static_dict = {
+                "id": self.id,
+                "name": self.name,
+                "description": self.description,
+                "task_type": self.task_type.value,
+                "command": self.command,
+                "goal_id": self.goal_id,
+                "status": None,
+                "priority": self.priority,
+                "dependencies": self.dependencies,
+                "estimated_duration": self.estimated_duration,
+                "actual_duration": None,
+                "output": "",
+                "agent_id": None,
+                "created_at": self.created_at,
+                "started_at": None,
+                "completed_at": None,
+                "retry_count": 0
+            }
+        
+        # Copying keeps the key order; only the mutable fields are refilled
+        d = static.copy()
+        d["status"] = self.status.value
+        d["actual_duration"] = self.actual_duration
+        d["output"] = self.output[:500] if self.output else ""
+        d["agent_id"] = self.agent_id
+        d["started_at"] = self.started_at
+        d["completed_at"] = self.completed_at
+        d["retry_count"] = self.retry_count
+        return d
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionPlan:
     id: str
     goal_id: str
@@ -141,16 +180,31 @@ class Planner:
         self.tasks: Dict[str, SubTask] = {}
         self.plans: Dict[str, ExecutionPlan] = {}
         self._lock = threading.Lock()
-        self._next_task_id = 1
-        self._next_plan_id = 1
-        self._callbacks: Dict[str, List[Callable]] = {
-            "plan_created": [],
-            "task_created": [],
-            "task_started": [],
-            "task_completed": [],
-            "task_failed": [],
-            "phase_completed": []
+        # status -> ids of tasks in that status, in self.tasks order
+        self._by_status: Dict[TaskStatus, Dict[str, None]] = {status: {} for status in TaskStatus}
+        # (-priority, created_at, seq, task_id) for every task that became
+        # pending with its dependencies met; seq keeps self.tasks order among
+        # ties. Entries that stopped being ready are dropped at the top
+        self._pending_heap: List[Tuple[int, float, int, str]] = []
+        self._task_seq: Dict[str, int] = {}
+        self._seq = itertools.count()
+        # task id -> dependencies not yet completed, and the reverse edges
+        self._remaining_deps: Dict[str, int] = {}
+        self._dependents: Dict[str, List[str]] = {}
+        # next() on a count is atomic, so ids need no lock
+        self._task_ids = itertools.count(1)
+        self._plan_ids = itertools.count(1)
+        # Copy-on-write: on() rebinds a new tuple, readers never lock.
+        # Callbacks always run after self._lock is released
+        self._callbacks: Dict[str, Tuple[Callable, ...]] = {
+            "plan_created": (),
+            "task_created": (),
+            "task_started": (),
+            "task_completed": (),
+            "task_failed": (),
+            "phase_completed": ()
         }
+        self._callbacks_lock = threading.Lock()
     
     def create_plan(self, goal: Goal, stealth: bool = False, aggressive: bool = False) -> ExecutionPlan:
         target = goal.metadata.get("target", "")
@@ -160,41 +214,35 @@ class Planner:
         
         phases = self._organize_into_phases(tasks)
         
+        plan = ExecutionPlan(
+            id=f"plan_{next(self._plan_ids)}",
+            goal_id=goal.id,
+            name=f"Plan for {goal.name}",
+            tasks=[t.id for t in tasks],
+            phases=phases
+        )
+        
         with self._lock:
-            plan_id = f"plan_{self._next_plan_id}"
-            self._next_plan_id += 1
-            
-            plan = ExecutionPlan(
-                id=plan_id,
-                goal_id=goal.id,
-                name=f"Plan for {goal.name}",
-                tasks=[t.id for t in tasks],
-                phases=phases
-            )
-            
-            self.plans[plan_id] = plan
+            self.plans[plan.id] = plan
             
             for task in tasks:
-                self.tasks[task.id] = task
-            
-            self._notify("plan_created", plan)
-            return plan
+                self._add_task(task)
+        
+        self._notify("plan_created", plan)
+        return plan
     
     def _detect_category(self, target: str) -> str:
-        import re
-        
-        ip_pattern = r'^(\d{1,3}\.){3}\d{1,3}(/\d{1,2})?$'
-        if re.match(ip_pattern, target):
-            return "ip"
-        
+        # Prefix checks first; none of these can look like an IP
         if target.startswith(("http://", "https://")):
             return "url"
         
-        if target.startswith("/") or target.startswith("./"):
+        if target.startswith(("/", "./")):
             return "path"
         
-        domain_pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z]{2,})+$'
-        if re.match(domain_pattern, target):
+        if _IP_RE.match(target):
+            return "ip"
+        
+        if _DOMAIN_RE.match(target):
             return "domain"
         
         return "url"
@@ -219,12 +267,8 @@ class Planner:
             elif aggressive and tool_name in self.AGGRESSIVE_MODIFIERS:
                 command = self._apply_modifier(command, self.AGGRESSIVE_MODIFIERS[tool_name])
             
-            with self._lock:
-                task_id = f"task_{self._next_task_id}"
-                self._next_task_id += 1
-            
             task = SubTask(
-                id=task_id,
+                id=f"task_{next(self._task_ids)}",
                 name=description,
                 description=f"Execute: {command}",
                 task_type=self._get_task_type(tool_name),
@@ -249,20 +293,7 @@ class Planner:
         return f"{tool} {modifier} {' '.join(args)}"
     
     def _get_task_type(self, tool_name: str) -> TaskType:
-        recon_tools = ["whois", "dig", "nslookup", "curl", "whatweb"]
-        scan_tools = ["nmap", "masscan", "rustscan"]
-        enum_tools = ["gobuster", "dirb", "ffuf", "subfinder", "amass"]
-        analyze_tools = ["nikto", "nuclei", "wpscan"]
-        
-        if tool_name in recon_tools:
-            return TaskType.RECON
-        elif tool_name in scan_tools:
-            return TaskType.SCAN
-        elif tool_name in enum_tools:
-            return TaskType.ENUMERATE
-        elif tool_name in analyze_tools:
-            return TaskType.ANALYZE
-        return TaskType.CUSTOM
+        return _TOOL_TASK_TYPES.get(tool_name, TaskType.CUSTOM)
     
     def _estimate_duration(self, tool_name: str, stealth: bool) -> int:
         base_durations = {
@@ -283,24 +314,11 @@ class Planner:
         return duration
     
     def _organize_into_phases(self, tasks: List[SubTask]) -> Dict[int, List[str]]:
-        phases = {
-            0: [],
-            1: [],
-            2: [],
-            3: []
-        }
-        
+        phases: Dict[int, List[str]] = defaultdict(list)
         for task in tasks:
-            if task.task_type == TaskType.RECON:
-                phases[0].append(task.id)
-            elif task.task_type == TaskType.SCAN:
-                phases[1].append(task.id)
-            elif task.task_type == TaskType.ENUMERATE:
-                phases[2].append(task.id)
-            else:
-                phases[3].append(task.id)
+            phases[_TASK_TYPE_PHASES.get(task.task_type, _LAST_PHASE)].append(task.id)
         
-        return {k: v for k, v in phases.items() if v}
+        return {k: phases[k] for k in sorted(phases)}
     
     def add_custom_task(
         self,
@@ -309,23 +327,21 @@ class Planner:
         name: str = "Custom Task",
         priority: int = 5
     ) -> SubTask:
+        task = SubTask(
+            id=f"task_{next(self._task_ids)}",
+            name=name,
+            description=f"Custom: {command}",
+            task_type=TaskType.CUSTOM,
+            command=command if command.startswith("RUN ") else f"RUN {command}",
+            goal_id=goal_id,
+            priority=priority
+        )
+        
         with self._lock:
-            task_id = f"task_{self._next_task_id}"
-            self._next_task_id += 1
-            
-            task = SubTask(
-                id=task_id,
-                name=name,
-                description=f"Custom: {command}",
-                task_type=TaskType.CUSTOM,
-                command=command if command.startswith("RUN ") else f"RUN {command}",
-                goal_id=goal_id,
-                priority=priority
-            )
-            
-            self.tasks[task_id] = task
-            self._notify("task_created", task)
-            return task
+            self._add_task(task)
+        
+        self._notify("task_created", task)
+        return task
     
     def add_tasks_from_llm(self, goal_id: str, commands: Dict[str, str]) -> List[SubTask]:
         tasks = []
@@ -346,12 +362,12 @@ class Planner:
                 return False
             
             task = self.tasks[task_id]
-            task.status = TaskStatus.RUNNING
+            self._set_status(task, TaskStatus.RUNNING)
             task.agent_id = agent_id
             task.started_at = time.time()
-            
-            self._notify("task_started", task)
-            return True
+        
+        self._notify("task_started", task)
+        return True
     
     def complete_task(self, task_id: str, output: str, success: bool = True) -> bool:
         with self._lock:
@@ -363,69 +379,167 @@ class Planner:
             task.completed_at = time.time()
             task.actual_duration = int(task.completed_at - (task.started_at or task.completed_at))
             
+            event = None
             if success:
-                task.status = TaskStatus.COMPLETED
-                self._notify("task_completed", task)
+                self._set_status(task, TaskStatus.COMPLETED)
+                event = "task_completed"
             else:
                 task.retry_count += 1
                 if task.retry_count >= task.max_retries:
-                    task.status = TaskStatus.FAILED
-                    self._notify("task_failed", task)
+                    self._set_status(task, TaskStatus.FAILED)
+                    event = "task_failed"
                 else:
-                    task.status = TaskStatus.PENDING
-            
-            return True
+                    self._set_status(task, TaskStatus.PENDING)
+        
+        if event:
+            self._notify(event, task)
+        return True
+    
+    def _add_task(self, task: SubTask):
+        # Caller must hold self._lock
+        self.tasks[task.id] = task
+        self._by_status[task.status][task.id] = None
+        self._task_seq[task.id] = next(self._seq)
+        
+        remaining = 0
+        for dep_id in task.dependencies:
+            self._dependents.setdefault(dep_id, []).append(task.id)
+            dep = self.tasks.get(dep_id)
+            if dep is None or dep.status is not TaskStatus.COMPLETED:
+                remaining += 1
+        self._remaining_deps[task.id] = remaining
+        
+        if task.status is TaskStatus.PENDING:
+            self._push_pending(task)
+        elif task.status is TaskStatus.COMPLETED:
+            self._dependency_changed(task.id, -1)
+    
+    def _dependency_changed(self, task_id: str, delta: int):
+        # Caller must hold self._lock; delta is -1 when task_id completed and
+        # +1 when it stopped being completed
+        remaining = self._remaining_deps
+        for child_id in self._dependents.get(task_id, ()):
+            remaining[child_id] += delta
+            if delta < 0 and not remaining[child_id]:
+                child = self.tasks.get(child_id)
+                if child is not None and child.status is TaskStatus.PENDING:
+                    self._push_pending(child)
+    
+    def _push_pending(self, task: SubTask):
+        # Caller must hold self._lock; task is already in the pending bucket
+        if self._remaining_deps[task.id]:
+            return
+        heap = self._pending_heap
+        if len(heap) > 2 * len(self._by_status[TaskStatus.PENDING]) + 64:
+            # Mostly stale entries; start over from the ready pending set
+            heap[:] = [
+                self._heap_entry(self.tasks[tid]) for tid in self._by_status[TaskStatus.PENDING]
+                if not self._remaining_deps[tid]
+            ]
+            heapq.heapify(heap)
+        else:
+            heapq.heappush(heap, self._heap_entry(task))
+    
+    def _heap_entry(self, task: SubTask) -> Tuple[int, float, int, str]:
+        return (-task.priority, task.created_at, self._task_seq[task.id], task.id)
+    
+    def _set_status(self, task: SubTask, status: TaskStatus):
+        # Caller must hold self._lock
+        if task.status is status:
+            return
+        self._by_status[task.status].pop(task.id, None)
+        if task.status is TaskStatus.COMPLETED:
+            self._dependency_changed(task.id, 1)
+        task.status = status
+        if status is TaskStatus.COMPLETED:
+            self._dependency_changed(task.id, -1)
+        bucket = self._by_status[status]
+        bucket[task.id] = None
+        if status is TaskStatus.PENDING:
+            if len(bucket) > 1:
+                # A retried task goes back to its original place in line
+                self._by_status[status] = {tid: None for tid in self.tasks if tid in bucket}
+            self._push_pending(task)
+    
+    def count_by_status(self, status: TaskStatus) -> int:
+        return len(self._by_status[status])
+    
+    def first_pending(self) -> Optional[SubTask]:
+        with self._lock:
+            for task_id in self._by_status[TaskStatus.PENDING]:
+                return self.tasks[task_id]
+            return None
     
     def get_next_task(self, plan_id: Optional[str] = None) -> Optional[SubTask]:
+        completed_phases: List[dict] = []
         with self._lock:
-            pending_tasks = [
-                t for t in self.tasks.values() 
-                if t.status == TaskStatus.PENDING
-            ]
-            
-            if plan_id and plan_id in self.plans:
-                plan = self.plans[plan_id]
-                phase_tasks = plan.phases.get(plan.current_phase, [])
-                pending_tasks = [t for t in pending_tasks if t.id in phase_tasks]
+            task = self._next_task_locked(plan_id, completed_phases)
+        
+        for data in completed_phases:
+            self._notify("phase_completed", data)
+        return task
+    
+    def _next_task_locked(self, plan_id: Optional[str], completed_phases: List[dict]) -> Optional[SubTask]:
+        # Caller must hold self._lock
+        if not (plan_id and plan_id in self.plans):
+            return self._next_ready_pending()
+        
+        plan = self.plans[plan_id]
+        pending_ids = self._by_status[TaskStatus.PENDING]
+        while True:
+            phase_tasks = plan.phases.get(plan.current_phase, [])
+            pending_tasks = [self.tasks[tid] for tid in phase_tasks if tid in pending_ids]
+            if pending_tasks:
+                break
             
-            if not pending_tasks:
-                if plan_id and plan_id in self.plans:
-                    self._advance_phase(plan_id)
-                    return self.get_next_task(plan_id)
+            if plan.status == "completed":
                 return None
-            
-            pending_tasks.sort(key=lambda t: (-t.priority, t.created_at))
-            
-            for task in pending_tasks:
-                deps_met = all(
-                    self.tasks.get(dep_id, SubTask("", "", "", TaskType.CUSTOM, "", "")).status == TaskStatus.COMPLETED
-                    for dep_id in task.dependencies
-                )
-                if deps_met:
-                    return task
-            
-            return None
+            phase = plan.current_phase
+            if self._advance_phase(plan_id):
+                completed_phases.append({"plan_id": plan_id, "phase": phase})
+            if plan.status == "completed" or plan.current_phase == phase:
+                # Finished, or the phase still has tasks in flight
+                return None
+        
+        # One pass over the phase instead of sorting it; same order as the heap
+        ready = [t for t in pending_tasks if not self._remaining_deps[t.id]]
+        return min(ready, key=self._heap_entry, default=None)
+    
+    def _next_ready_pending(self) -> Optional[SubTask]:
+        # Caller must hold self._lock
+        heap = self._pending_heap
+        while heap:
+            task = self.tasks.get(heap[0][3])
+            if (task is not None and task.status is TaskStatus.PENDING
+                    and not self._remaining_deps[task.id]):
+                return task
+            heapq.heappop(heap)
+        return None
     
-    def _advance_phase(self, plan_id: str):
+    def _advance_phase(self, plan_id: str) -> bool:
+        # Caller must hold self._lock; True if the current phase was finished
         if plan_id not in self.plans:
-            return
+            return False
         
         plan = self.plans[plan_id]
         current_phase_tasks = plan.phases.get(plan.current_phase, [])
         
+        done = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.SKIPPED)
         all_complete = all(
-            self.tasks.get(tid, SubTask("", "", "", TaskType.CUSTOM, "", "")).status in 
-            [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.SKIPPED]
+            tid in self.tasks and self.tasks[tid].status in done
             for tid in current_phase_tasks
         )
         
-        if all_complete:
-            self._notify("phase_completed", {"plan_id": plan_id, "phase": plan.current_phase})
-            next_phase = plan.current_phase + 1
-            if next_phase in plan.phases:
-                plan.current_phase = next_phase
-            else:
-                plan.status = "completed"
+        if not all_complete:
+            return False
+        
+        # Phases with no tasks are never created, so the numbers can skip
+        next_phase = min((p for p in plan.phases if p > plan.current_phase), default=None)
+        if next_phase is not None:
+            plan.current_phase = next_phase
+        else:
+            plan.status = "completed"
+        return True
     
     def get_plan_progress(self, plan_id: str) -> dict:
         if plan_id not in self.plans:
@@ -454,14 +568,17 @@ class Planner:
         }
     
     def get_tasks_for_queue(self) -> List[dict]:
-        return [t.to_dict() for t in self.tasks.values() if t.status == TaskStatus.PENDING]
+        with self._lock:
+            pending = [self.tasks[tid] for tid in self._by_status[TaskStatus.PENDING]]
+        return [t.to_dict() for t in pending]
     
     def on(self, event: str, callback: Callable):
-        if event in self._callbacks:
-            self._callbacks[event].append(callback)
+        with self._callbacks_lock:
+            if event in self._callbacks:
+                self._callbacks[event] = self._callbacks[event] + (callback,)
     
     def _notify(self, event: str, data):
-        for callback in self._callbacks.get(event, []):
+        for callback in self._callbacks.get(event, ()):
             try:
                 callback(data)
             except Exception as e:
@@ -471,3 +588,9 @@ class Planner:
         with self._lock:
             self.tasks.clear()
             self.plans.clear()
+            self._pending_heap.clear()
+            self._task_seq.clear()
+            self._remaining_deps.clear()
+            self._dependents.clear()
+            for bucket in self._by_status.values():
+                bucket.clear()
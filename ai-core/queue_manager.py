@@ -2,14 +2,16 @@
 Queue Manager - Handles command queue and distribution
 """
 
+import heapq
 import threading
 import time
+from bisect import bisect_left
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Callable
-from collections import deque
+from typing import Dict, List, Optional, Callable, Tuple
+from collections import Counter, deque
 
 
-@dataclass
+@dataclass(slots=True)
 class QueueItem:
     index: int
     command: str
@@ -40,13 +42,25 @@ class QueueManager:
     def __init__(self):
         self.queue: List[QueueItem] = []
         self._lock = threading.Lock()
+        # index -> item; indexes only grow, so self.queue is sorted by index
+        self._by_index: Dict[int, QueueItem] = {}
+        # Min-heap of indexes that went pending; entries whose item has since
+        # been claimed or removed are skipped when popped
+        self._pending: List[int] = []
+        # status -> number of items in it
+        self._counts: Counter = Counter()
+        # Signalled whenever commands are queued so idle workers wake at once
+        self._work_available = threading.Condition(self._lock)
         self._next_index = 1
-        self._callbacks: Dict[str, List[Callable]] = {
-            "item_added": [],
-            "item_removed": [],
-            "item_updated": [],
-            "queue_cleared": []
+        # Copy-on-write: on() rebinds a new tuple, readers never lock.
+        # Callbacks always run after self._lock is released
+        self._callbacks: Dict[str, Tuple[Callable, ...]] = {
+            "item_added": (),
+            "item_removed": (),
+            "item_updated": (),
+            "queue_cleared": ()
         }
+        self._callbacks_lock = threading.Lock()
     
     def add_commands(self, commands: Dict[str, str]) -> List[QueueItem]:
         added_items = []
@@ -56,11 +70,14 @@ class QueueManager:
                     index=self._next_index,
                     command=commands[key]
                 )
-                self.queue.append(item)
+                self._append(item)
                 added_items.append(item)
                 self._next_index += 1
-                self._notify("item_added", item)
+            if added_items:
+                self._work_available.notify_all()
         
+        for item in added_items:
+            self._notify("item_added", item)
         return added_items
     
     def add_single(self, command: str) -> QueueItem:
@@ -69,78 +86,149 @@ class QueueManager:
                 index=self._next_index,
                 command=command
             )
-            self.queue.append(item)
+            self._append(item)
             self._next_index += 1
-            self._notify("item_added", item)
-            return item
+            self._work_available.notify_all()
+        
+        self._notify("item_added", item)
+        return item
+    
+    def _append(self, item: QueueItem):
+        # Caller must hold self._lock
+        self.queue.append(item)
+        self._by_index[item.index] = item
+        self._counts[item.status] += 1
+        if item.status == "pending":
+            heapq.heappush(self._pending, item.index)
+    
+    def _set_status(self, item: QueueItem, status: str):
+        # Caller must hold self._lock
+        if item.status == status:
+            return
+        self._counts[item.status] -= 1
+        self._counts[status] += 1
+        item.status = status
+        if status == "pending":
+            heapq.heappush(self._pending, item.index)
+    
+    def _pop_pending(self) -> Optional[QueueItem]:
+        # Caller must hold self._lock
+        pending = self._pending
+        while pending:
+            item = self._by_index.get(heapq.heappop(pending))
+            if item is not None and item.status == "pending":
+                return item
+        return None
     
     def remove(self, index: int) -> bool:
         with self._lock:
-            for i, item in enumerate(self.queue):
-                if item.index == index:
-                    removed = self.queue.pop(i)
-                    self._notify("item_removed", removed)
-                    return True
-            return False
+            removed = self._by_index.pop(index, None)
+            if removed is None:
+                return False
+            del self.queue[bisect_left(self.queue, index, key=lambda item: item.index)]
+            self._counts[removed.status] -= 1
+        
+        self._notify("item_removed", removed)
+        return True
     
     def get_next_pending(self) -> Optional[QueueItem]:
         with self._lock:
-            for item in self.queue:
-                if item.status == "pending":
-                    item.status = "running"
-                    item.started_at = time.time()
-                    self._notify("item_updated", item)
-                    return item
-            return None
+            item = self._pop_pending()
+            if item is None:
+                return None
+            self._set_status(item, "running")
+            item.started_at = time.time()
+        
+        self._notify("item_updated", item)
+        return item
+    
+    def get_next_pending_batch(self, max_items: int, workers: int = 1) -> List[QueueItem]:
+        """Claim up to max_items pending items at once, leaving a fair share
+        of the pending work for the other workers."""
+        with self._lock:
+            share = -(-self._counts["pending"] // max(workers, 1))
+            batch = []
+            now = time.time()
+            while len(batch) < min(max_items, share):
+                item = self._pop_pending()
+                if item is None:
+                    break
+                self._set_status(item, "running")
+                item.started_at = now
+                batch.append(item)
+        
+        for item in batch:
+            self._notify("item_updated", item)
+        return batch
     
     def update_item(self, index: int, status: str, output: str = "", error: str = "", agent_id: int = None):
         with self._lock:
-            for item in self.queue:
-                if item.index == index:
-                    item.status = status
-                    item.output = output
-                    item.error = error
-                    if agent_id:
-                        item.agent_id = agent_id
-                    if status in ["completed", "failed"]:
-                        item.completed_at = time.time()
-                    self._notify("item_updated", item)
-                    return
+            item = self._by_index.get(index)
+            if item is None:
+                return
+            self._set_status(item, status)
+            item.output = output
+            item.error = error
+            if agent_id:
+                item.agent_id = agent_id
+            if status in ["completed", "failed"]:
+                item.completed_at = time.time()
+            elif status == "pending":
+                self._work_available.notify_all()
+        
+        self._notify("item_updated", item)
+    
+    def wait_for_work(self, timeout: Optional[float] = None) -> bool:
+        """Block until a pending item exists or timeout expires."""
+        with self._work_available:
+            return self._work_available.wait_for(
+                lambda: self._counts["pending"] > 0,
+                timeout
+            )
     
     def get_all(self) -> List[QueueItem]:
         return list(self.queue)
     
     def get_pending_count(self) -> int:
-        return sum(1 for item in self.queue if item.status == "pending")
+        return self._counts["pending"]
     
     def get_running_count(self) -> int:
-        return sum(1 for item in self.queue if item.status == "running")
+        return self._counts["running"]
     
     def clear(self):
         with self._lock:
             self.queue = []
-            self._notify("queue_cleared", None)
+            self._by_index.clear()
+            self._pending.clear()
+            self._counts.clear()
+        
+        self._notify("queue_cleared", None)
     
     def clear_completed(self):
         with self._lock:
             self.queue = [item for item in self.queue if item.status not in ["completed", "failed"]]
+            self._by_index = {item.index: item for item in self.queue}
+            self._counts["completed"] = 0
+            self._counts["failed"] = 0
     
     def on(self, event: str, callback: Callable):
-        if event in self._callbacks:
-            self._callbacks[event].append(callback)
+        with self._callbacks_lock:
+            if event in self._callbacks:
+                self._callbacks[event] = self._callbacks[event] + (callback,)
     
     def _notify(self, event: str, item: Optional[QueueItem]):
-        for callback in self._callbacks.get(event, []):
+        for callback in self._callbacks.get(event, ()):
             try:
                 callback(item)
             except Exception as e:
                 print(f"Callback error: {e}")
     
     def get_summary(self) -> dict:
+        counts = self._counts
         return {
             "total": len(self.queue),
-            "pending": self.get_pending_count(),
-            "running": self.get_running_count(),
-            "completed": sum(1 for item in self.queue if item.status == "completed"),
-            "failed": sum(1 for item in self.queue if item.status == "failed")
+            "pending": counts["pending"],
+            "running": counts["running"],
+            "completed": counts["completed"],
+            "failed": counts["failed"]
         }
@@ -0,0 +1,62 @@
+"""
+Text Index - Substring lookups over a token vocabulary for keyword search
+"""
+
+from typing import Dict, Iterator, Set
+from collections import defaultdict
+
+
+# Every substring up to this length is indexed; longer query words are
+# answered by intersecting the sets of their grams of this length
+_GRAM_SIZE = 3
+
+
+def _grams(token: str) -> Iterator[str]:
+    length = len(token)
+    for size in range(1, min(_GRAM_SIZE, length) + 1):
+        for start in range(length - size + 1):
+            yield token[start:start + size]
+
+
+class SubstringIndex:
+    """Vocabulary of tokens keyed by their short substrings, so finding every
+    token that contains a query word costs a few set lookups instead of a
+    scan of the whole vocabulary. Not thread-safe; the owner's lock covers it."""
+    
+    __slots__ = ("_tokens_by_gram",)
+    
+    def __init__(self):
+        self._tokens_by_gram: Dict[str, Set[str]] = defaultdict(set)
+    
+    def add(self, token: str):
+        for gram in _grams(token):
+            self._tokens_by_gram[gram].add(token)
+    
+    def discard(self, token: str):
+        for gram in _grams(token):
+            tokens = self._tokens_by_gram.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_gram[gram]
+    
+    def clear(self):
+        self._tokens_by_gram.clear()
+    
+    def tokens_containing(self, fragment: str) -> Set[str]:
+        """Every indexed token that has fragment as a substring."""
+        tokens_by_gram = self._tokens_by_gram
+        if len(fragment) <= _GRAM_SIZE:
+            return set(tokens_by_gram.get(fragment, ()))
+        
+        gram_sets = []
+        for start in range(len(fragment) - _GRAM_SIZE + 1):
+            tokens = tokens_by_gram.get(fragment[start:start + _GRAM_SIZE])
+            if not tokens:
+                return set()
+            gram_sets.append(tokens)
+        gram_sets.sort(key=len)
+        
+        candidates = gram_sets[0].intersection(*gram_sets[1:])
+        # Sharing all grams does not put them in the right order
+        return {token for token in candidates if fragment in token}
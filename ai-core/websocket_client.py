@@ -101,6 +101,13 @@ class WebSocketClient:
             "command": command
         })
     
+    def execute_commands(self, agent_id: int, commands: List[str]):
+        # One frame for several commands; the backend runs them in order
+        self.send("execute_batch", {
+            "agent_id": agent_id,
+            "commands": commands
+        })
+    
     def chat(self, mode: str, content: str):
         self.send("chat", {
             "mode": mode,
@@ -1073,6 +1073,20 @@ func handleMessage(conn *websocket.Conn, msg Message) {
                 command := payload["command"].(string)
                 go manager.ExecuteCommand(agentID, command)
 
+        case "execute_batch":
+                payload := msg.Payload.(map[string]interface{})
+                agentID := int(payload["agent_id"].(float64))
+                raw := payload["commands"].([]interface{})
+                commands := make([]string, 0, len(raw))
+                for _, c := range raw {
+                        commands = append(commands, c.(string))
+                }
+                go func() {
+                        for _, command := range commands {
+                                manager.ExecuteCommand(agentID, command)
+                        }
+                }()
+
         case "terminate":
                 manager.GracefulTerminate("<END!>")
 
@@ -0,0 +1,37 @@
+"""
+Test support - Loads ai-core as an importable package for the test modules
+"""
+
+import importlib.util
+import os
+import sys
+import time
+
+
+PACKAGE_NAME = "aicore"
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ai-core")
+
+
+def load_package():
+    """The ai-core directory as the package `aicore`; its hyphenated name
+    cannot be imported directly."""
+    package = sys.modules.get(PACKAGE_NAME)
+    if package is None:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE_NAME,
+            os.path.join(PACKAGE_DIR, "__init__.py"),
+            submodule_search_locations=[PACKAGE_DIR]
+        )
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE_NAME] = package
+        spec.loader.exec_module(package)
+    return package
+
+
+def wait_until(predicate, timeout: float = 5.0, interval: float = 0.01) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return predicate()
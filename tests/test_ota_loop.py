@@ -0,0 +1,182 @@
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from support import load_package, wait_until
+
+aicore = load_package()
+from aicore import ota_loop
+from aicore.goal_system import GoalSystem
+from aicore.memory_system import MemorySystem
+from aicore.ota_loop import Action, AutonomyLevel, OTALoop
+from aicore.planner import Planner, TaskStatus
+
+
+class SlowExecutor:
+    def __init__(self, delay: float = 0.0, exit_code: int = 0):
+        self.delay = delay
+        self.exit_code = exit_code
+        self.commands = []
+        self.started = threading.Event()
+    
+    def execute_command(self, agent_id: int, command: str) -> dict:
+        self.commands.append(command)
+        self.started.set()
+        time.sleep(self.delay)
+        return {"exit_code": self.exit_code, "output": "done"}
+
+
+class OTALoopTestCase(unittest.TestCase):
+    def setUp(self):
+        self.storage = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage, True)
+        self.goals = GoalSystem()
+        self.planner = Planner()
+        self.memory = MemorySystem(self.storage)
+        self.loop = OTALoop(self.goals, self.planner, self.memory)
+        self.loop.loop_delay = 0.01
+        self.loop.set_autonomy_level(AutonomyLevel.FULL_AUTONOMOUS)
+        self.addCleanup(self.loop.stop)
+        
+        goal = self.goals.create_goal("Recon", "Scan the target")
+        self.goals.start_goal(goal.id)
+        self.goal_id = goal.id
+    
+    def add_task(self, command: str = "nmap 10.0.0.1"):
+        return self.planner.add_custom_task(self.goal_id, command)
+
+
+class StartStopTest(OTALoopTestCase):
+    def test_start_and_stop(self):
+        self.loop.start()
+        self.assertTrue(self.loop.running)
+        self.assertTrue(wait_until(lambda: self.loop.loop_count > 0))
+        
+        self.loop.stop()
+        self.assertFalse(self.loop.running)
+        self.assertFalse(self.loop._loop_thread.is_alive())
+    
+    def test_restart_after_stop(self):
+        self.loop.start()
+        self.loop.stop()
+        
+        self.loop.start()
+        self.assertTrue(wait_until(lambda: self.loop.loop_count > 0))
+        self.loop.stop()
+        self.assertFalse(self.loop._loop_thread.is_alive())
+    
+    def test_stop_waits_for_inflight_action(self):
+        executor = SlowExecutor(delay=0.5)
+        self.loop.executor = executor
+        task = self.add_task()
+        
+        self.loop.start()
+        self.assertTrue(executor.started.wait(5))
+        self.assertIs(task.status, TaskStatus.RUNNING)
+        self.loop.stop()
+        
+        self.assertIs(task.status, TaskStatus.COMPLETED)
+        self.assertEqual(task.retry_count, 0)
+    
+    def test_cancelled_action_returns_task_for_retry(self):
+        executor = SlowExecutor(delay=0.5)
+        self.loop.executor = executor
+        task = self.add_task()
+        
+        with mock.patch.object(ota_loop, "_INFLIGHT_DRAIN_TIMEOUT", 0.01):
+            self.loop.start()
+            self.assertTrue(executor.started.wait(5))
+            self.loop.stop()
+        
+        self.assertIs(task.status, TaskStatus.PENDING)
+        self.assertEqual(task.retry_count, 1)
+    
+    def test_max_loops_waits_for_inflight_action(self):
+        executor = SlowExecutor(delay=0.3)
+        self.loop.executor = executor
+        self.loop.max_loops = 1
+        task = self.add_task()
+        
+        self.loop.start()
+        self.loop._loop_thread.join(5)
+        
+        self.assertFalse(self.loop._loop_thread.is_alive())
+        self.assertIs(task.status, TaskStatus.COMPLETED)
+    
+    def test_without_executor_tasks_are_not_left_running(self):
+        task = self.add_task()
+        
+        self.loop.start()
+        self.assertTrue(wait_until(lambda: self.loop.loop_count >= 3))
+        self.loop.stop()
+        
+        self.assertIs(task.status, TaskStatus.PENDING)
+
+
+class ApprovalTest(OTALoopTestCase):
+    def test_approve_without_event_loop(self):
+        executor = SlowExecutor()
+        self.loop.executor = executor
+        action = Action(
+            id="action_1",
+            action_type="execute_task",
+            parameters={"command": "ls"},
+            requires_approval=True
+        )
+        self.loop.pending_approvals[action.id] = action
+        
+        self.assertTrue(self.loop.approve_action(action.id))
+        self.assertTrue(action.executed)
+        self.assertEqual(executor.commands, ["ls"])
+        self.assertFalse(self.loop.approve_action(action.id))
+    
+    def test_approve_while_running(self):
+        executor = SlowExecutor()
+        self.loop.executor = executor
+        self.loop.set_autonomy_level(AutonomyLevel.MANUAL)
+        task = self.add_task()
+        
+        self.loop.start()
+        self.assertTrue(wait_until(lambda: self.loop.get_pending_approvals()))
+        action = self.loop.get_pending_approvals()[0]
+        
+        self.assertTrue(self.loop.approve_action(action.id))
+        self.assertTrue(action.executed)
+        self.assertIs(task.status, TaskStatus.COMPLETED)
+    
+    def test_reject(self):
+        self.loop.set_autonomy_level(AutonomyLevel.MANUAL)
+        self.add_task()
+        
+        self.loop.start()
+        self.assertTrue(wait_until(lambda: self.loop.get_pending_approvals()))
+        action = self.loop.get_pending_approvals()[0]
+        
+        self.assertTrue(self.loop.reject_action(action.id))
+        self.assertNotIn(action.id, self.loop.pending_approvals)
+
+
+class AsyncStartStopTest(OTALoopTestCase):
+    def test_start_async_and_stop_async(self):
+        executor = SlowExecutor(delay=0.2)
+        self.loop.executor = executor
+        task = self.add_task()
+        
+        async def run():
+            await self.loop.start_async()
+            while not executor.started.is_set():
+                await asyncio.sleep(0.01)
+            await self.loop.stop_async()
+        
+        asyncio.run(run())
+        
+        self.assertFalse(self.loop.running)
+        self.assertIs(task.status, TaskStatus.COMPLETED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+
+from support import load_package
+
+aicore = load_package()
+from aicore.planner import Planner, SubTask, TaskStatus, TaskType
+
+
+def add_task(planner: Planner, task_id: str, priority: int = 5, dependencies=None) -> SubTask:
+    task = SubTask(
+        id=task_id,
+        name=task_id,
+        description=task_id,
+        task_type=TaskType.CUSTOM,
+        command=f"RUN echo {task_id}",
+        goal_id="goal_1",
+        priority=priority,
+        dependencies=list(dependencies or [])
+    )
+    with planner._lock:
+        planner._add_task(task)
+    return task
+
+
+class PendingHeapTest(unittest.TestCase):
+    def setUp(self):
+        self.planner = Planner()
+    
+    def test_highest_priority_first(self):
+        add_task(self.planner, "low", priority=1)
+        add_task(self.planner, "high", priority=9)
+        
+        self.assertEqual(self.planner.get_next_task().id, "high")
+    
+    def test_retry_returns_task_to_heap(self):
+        first = add_task(self.planner, "first", priority=9)
+        add_task(self.planner, "second", priority=5)
+        
+        self.planner.start_task("first", 1)
+        self.assertEqual(self.planner.get_next_task().id, "second")
+        
+        self.planner.complete_task("first", "", success=False)
+        self.assertIs(first.status, TaskStatus.PENDING)
+        self.assertEqual(first.retry_count, 1)
+        self.assertEqual(self.planner.get_next_task().id, "first")
+        self.assertEqual(self.planner.first_pending().id, "first")
+    
+    def test_exhausted_retries_leave_the_heap(self):
+        first = add_task(self.planner, "first", priority=9)
+        add_task(self.planner, "second", priority=5)
+        
+        for _ in range(first.max_retries):
+            self.planner.start_task("first", 1)
+            self.planner.complete_task("first", "", success=False)
+        
+        self.assertIs(first.status, TaskStatus.FAILED)
+        self.assertEqual(self.planner.get_next_task().id, "second")
+        self.assertEqual(self.planner.count_by_status(TaskStatus.PENDING), 1)
+    
+    def test_empty_after_all_complete(self):
+        add_task(self.planner, "only")
+        self.planner.start_task("only", 1)
+        self.planner.complete_task("only", "done")
+        
+        self.assertIsNone(self.planner.get_next_task())
+
+
+class DependencyTest(unittest.TestCase):
+    def setUp(self):
+        self.planner = Planner()
+    
+    def test_dependent_waits_for_dependency(self):
+        add_task(self.planner, "scan", priority=1)
+        add_task(self.planner, "exploit", priority=9, dependencies=["scan"])
+        
+        self.assertEqual(self.planner.get_next_task().id, "scan")
+        self.planner.start_task("scan", 1)
+        self.assertIsNone(self.planner.get_next_task())
+        
+        self.planner.complete_task("scan", "open ports")
+        self.assertEqual(self.planner.get_next_task().id, "exploit")
+    
+    def test_failed_attempt_does_not_unblock(self):
+        add_task(self.planner, "scan")
+        add_task(self.planner, "exploit", dependencies=["scan"])
+        
+        self.planner.start_task("scan", 1)
+        self.planner.complete_task("scan", "", success=False)
+        
+        self.assertEqual(self.planner.get_next_task().id, "scan")
+    
+    def test_all_dependencies_required(self):
+        add_task(self.planner, "a")
+        add_task(self.planner, "b")
+        add_task(self.planner, "report", priority=9, dependencies=["a", "b"])
+        
+        self.planner.start_task("a", 1)
+        self.planner.complete_task("a", "")
+        self.assertEqual(self.planner.get_next_task().id, "b")
+        
+        self.planner.start_task("b", 1)
+        self.planner.complete_task("b", "")
+        self.assertEqual(self.planner.get_next_task().id, "report")
+    
+    def test_dependency_added_later(self):
+        add_task(self.planner, "exploit", priority=9, dependencies=["scan"])
+        self.assertIsNone(self.planner.get_next_task())
+        
+        add_task(self.planner, "scan", priority=1)
+        self.planner.start_task("scan", 1)
+        self.planner.complete_task("scan", "")
+        
+        self.assertEqual(self.planner.get_next_task().id, "exploit")
+    
+    def test_already_completed_dependency(self):
+        add_task(self.planner, "scan")
+        self.planner.start_task("scan", 1)
+        self.planner.complete_task("scan", "")
+        
+        add_task(self.planner, "exploit", dependencies=["scan"])
+        self.assertEqual(self.planner.get_next_task().id, "exploit")
+
+
+if __name__ == "__main__":
+    unittest.main()
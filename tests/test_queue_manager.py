@@ -0,0 +1,104 @@
+import random
+import threading
+import unittest
+
+from support import load_package
+
+aicore = load_package()
+from aicore.queue_manager import QueueManager
+
+
+class PendingOrderTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = QueueManager()
+        for i in range(5):
+            self.queue.add_single(f"echo {i}")
+    
+    def test_claims_in_index_order(self):
+        batch = self.queue.get_next_pending_batch(3)
+        
+        self.assertEqual([item.index for item in batch], [1, 2, 3])
+        self.assertTrue(all(item.status == "running" for item in batch))
+        self.assertEqual(self.queue.get_pending_count(), 2)
+        self.assertEqual(self.queue.get_running_count(), 3)
+    
+    def test_batch_leaves_a_share_for_other_workers(self):
+        batch = self.queue.get_next_pending_batch(10, workers=2)
+        
+        self.assertEqual(len(batch), 3)
+    
+    def test_retried_item_goes_back_in_line(self):
+        first, second = self.queue.get_next_pending_batch(2)
+        self.queue.update_item(first.index, "pending")
+        
+        self.assertEqual(self.queue.get_next_pending().index, first.index)
+        self.assertEqual(self.queue.get_next_pending().index, 3)
+    
+    def test_removed_item_is_not_claimed(self):
+        self.queue.remove(1)
+        self.queue.remove(3)
+        
+        batch = self.queue.get_next_pending_batch(10)
+        self.assertEqual([item.index for item in batch], [2, 4, 5])
+        self.assertIsNone(self.queue.get_next_pending())
+    
+    def test_completed_item_is_not_claimed_again(self):
+        item = self.queue.get_next_pending()
+        self.queue.update_item(item.index, "completed", output="ok")
+        
+        claimed = self.queue.get_next_pending_batch(10)
+        self.assertNotIn(item.index, [i.index for i in claimed])
+
+
+class RemoveRaceTest(unittest.TestCase):
+    def test_remove_racing_batch_claims(self):
+        queue = QueueManager()
+        queue.add_commands({str(i): f"echo {i}" for i in range(1, 2001)})
+        indexes = [item.index for item in queue.get_all()]
+        
+        claimed = []
+        removed = []
+        claimed_lock = threading.Lock()
+        start = threading.Barrier(5)
+        
+        def claimer():
+            start.wait()
+            while True:
+                batch = queue.get_next_pending_batch(7, workers=4)
+                if not batch:
+                    return
+                with claimed_lock:
+                    claimed.extend(item.index for item in batch)
+        
+        def remover():
+            order = indexes[:]
+            random.Random(7).shuffle(order)
+            start.wait()
+            for index in order[:1000]:
+                if queue.remove(index):
+                    removed.append(index)
+        
+        threads = [threading.Thread(target=claimer) for _ in range(4)]
+        threads.append(threading.Thread(target=remover))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        
+        self.assertEqual(len(claimed), len(set(claimed)))
+        self.assertEqual(len(removed), 1000)
+        # Everything was either claimed or removed while still pending
+        self.assertEqual(set(claimed) | set(removed), set(indexes))
+        
+        remaining = queue.get_all()
+        self.assertEqual(len(remaining), len(indexes) - len(removed))
+        self.assertEqual(queue.get_pending_count(), 0)
+        self.assertEqual(
+            queue.get_running_count(),
+            sum(1 for item in remaining if item.status == "running")
+        )
+        self.assertEqual([item.index for item in remaining], sorted(set(indexes) - set(removed)))
+
+
+if __name__ == "__main__":
+    unittest.main()